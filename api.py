@@ -9,34 +9,71 @@ Endpoints:
   GET  /tables/<table>/data?last_columns=10&limit=10
       → first column + last N columns, sorted by the last column DESC with NULLS LAST,
         returns up to 'limit' rows (defaults: last_columns=10, limit=10)
+  GET  /tables/<table>/overview?columns=4&limit=16&top=50
+      → { data: <same as /data>, top_players: <same as /top-players> } in one request
+  GET  /last-update                             → { update_id, ts } of the newest update batch
+  POST /admin/flush-schema-cache                → drop cached leaderboard names/ids and payloads
+                                                  (requires X-Admin-Token == ADMIN_TOKEN)
 
 Notes:
   - Prefers DATABASE_PRIVATE_URL, then DATABASE_URL, then DATABASE_PUBLIC_URL
-  - Uses short-lived autocommit connections to avoid long-held locks
+  - Postgres connections come from a process-wide autocommit pool (PG_POOL_MIN/PG_POOL_MAX);
+    requests beyond PG_POOL_MAX wait for a free connection instead of failing;
+    SQLite connections are reused per thread (autocommit, WAL journal)
+  - Read payloads are cached for RESPONSE_CACHE_TTL seconds (default 30) per newest update id,
+    and sent with ETag + Cache-Control (If-None-Match → 304)
+  - With GUNICORN_WORKER_CLASS=gevent, psycopg2 is made cooperative via psycogreen
+  - Leaderboard names/ids are cached in-process for SCHEMA_CACHE_TTL seconds (default 60)
   - Sorting uses numeric parsing with NULLS LAST for robust ordering
+  - JSON bodies are encoded with orjson when available (same output format as jsonify)
   - CORS enabled
 """
 
+import datetime
+import decimal
+import hashlib
+import hmac
+import json
 import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from typing import Dict, List, Tuple
 from urllib.parse import urlparse
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
+from werkzeug.http import http_date
 import psycopg2
+import psycopg2.extensions
+
+# Load .env before any module-level os.getenv below (worker class, cache TTLs, admin token)
+load_dotenv()
+
+if os.getenv("GUNICORN_WORKER_CLASS") == "gevent":
+    # Make psycopg2 yield to the gevent hub while waiting on the server
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
 from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
 import sqlite3
 
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to flask.jsonify
+    orjson = None
+
 
 
+@lru_cache(maxsize=1)
 def resolve_db_config():
     """Decide whether to use PostgreSQL or SQLite based on env vars.
     Returns a tuple (driver, conn_info), where driver is 'postgres' or 'sqlite'.
     For postgres, conn_info is a parsed urlparse result; for sqlite, it's a file path.
+    Resolved once per process (.env is loaded at import): urlparse() stays off the request path.
     """
-    load_dotenv()
-    
     sqlite_path = os.getenv("SQLITE_DB_PATH") or os.getenv("DB_PATH")
    
     pg_url = None
@@ -53,66 +90,297 @@ def resolve_db_config():
     return ("sqlite", os.path.abspath("gg_leaderboards.db"))
 
 
+SQLITE_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-65536;
+"""
+
+
 def open_connection():
     """Open a short-lived autocommit connection to the configured DB."""
     driver, info = resolve_db_config()
     if driver == "sqlite":
-        conn = sqlite3.connect(info)
+        conn = sqlite3.connect(info, isolation_level=None)
         conn.row_factory = sqlite3.Row
+        # WAL lets API readers run alongside the scraper's writes
+        conn.executescript(SQLITE_PRAGMAS)
         return conn
     # postgres
-    parsed = info
-    conn = psycopg2.connect(
-        host=parsed.hostname,
-        port=parsed.port or 5432,
-        database=(parsed.path[1:] if parsed.path else None),
-        user=parsed.username,
-        password=parsed.password,
-    )
+    conn = psycopg2.connect(**pg_connect_kwargs(info))
     conn.autocommit = True
     return conn
 
 
+def pg_connect_kwargs(parsed) -> Dict[str, object]:
+    """psycopg2.connect() keyword arguments for a parsed Postgres URL."""
+    return {
+        "host": parsed.hostname,
+        "port": parsed.port or 5432,
+        "database": (parsed.path[1:] if parsed.path else None),
+        "user": parsed.username,
+        "password": parsed.password,
+    }
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has PREPAREd server-side."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def execute_prepared(cur, name: str, query: str, params: tuple) -> None:
+    """Execute `query` (written with %s placeholders) as the named prepared statement.
+    Parse/plan happens once per pooled connection; later calls only send EXECUTE.
+    """
+    conn = cur.connection
+    if name not in conn.prepared:
+        parts = query.split("%s")
+        body = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], 1))
+        cur.execute(f"PREPARE {name} AS {body}")
+        conn.prepared.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    cur.execute(f"EXECUTE {name} ({placeholders})", params)
+
+
+_PG_POOL = None
+_PG_POOL_SLOTS = None
+_PG_POOL_LOCK = threading.Lock()
+
+
+def get_pg_pool() -> ThreadedConnectionPool:
+    """Return the process-wide Postgres pool, creating it on first use."""
+    global _PG_POOL, _PG_POOL_SLOTS
+    if _PG_POOL is None:
+        with _PG_POOL_LOCK:
+            if _PG_POOL is None:
+                _, parsed = resolve_db_config()
+                maxconn = int(os.getenv("PG_POOL_MAX", "20"))
+                # getconn() raises PoolError when exhausted, so requests queue here instead;
+                # under gevent the patched semaphore parks the greenlet rather than the worker
+                _PG_POOL_SLOTS = threading.BoundedSemaphore(maxconn)
+                _PG_POOL = ThreadedConnectionPool(
+                    minconn=int(os.getenv("PG_POOL_MIN", "2")),
+                    maxconn=maxconn,
+                    connection_factory=PreparingConnection,
+                    **pg_connect_kwargs(parsed),
+                )
+    return _PG_POOL
+
+
+_SQLITE_LOCAL = threading.local()
+
+
+def get_sqlite_connection() -> sqlite3.Connection:
+    """Return this thread's SQLite connection, opening it on first use."""
+    conn = getattr(_SQLITE_LOCAL, "conn", None)
+    if conn is None:
+        conn = open_connection()
+        _SQLITE_LOCAL.conn = conn
+    return conn
+
+
+@contextmanager
+def get_conn():
+    """Yield a connection for one request.
+    Postgres connections are borrowed from the pool (autocommit) and always returned;
+    SQLite connections are long-lived, one per thread.
+    """
+    driver, _ = resolve_db_config()
+    if driver == "sqlite":
+        yield get_sqlite_connection()
+        return
+    pool = get_pg_pool()
+    # Wait for a free connection rather than failing once PG_POOL_MAX requests hold one
+    _PG_POOL_SLOTS.acquire()
+    try:
+        conn = pool.getconn()
+        try:
+            conn.autocommit = True
+            yield conn
+        finally:
+            # Drop connections that died mid-request instead of handing them out again
+            pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _PG_POOL_SLOTS.release()
+
+
+class TTLCache:
+    """Small thread-safe key/value cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[tuple, Tuple[float, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """Return the cached value, or None when missing/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: tuple, value) -> None:
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                # Evict the entry closest to expiry
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# Leaderboard names/ids only change when the scraper meets a new blind level
+schema_cache = TTLCache(ttl=float(os.getenv("SCHEMA_CACHE_TTL", "60")))
+
+
+def lookup_leaderboard_id(cur, driver: str, leaderboard: str):
+    """Resolve a leaderboard name to its id (cached), or None if it does not exist."""
+    key = ("leaderboard_id", leaderboard)
+    lb_id = schema_cache.get(key)
+    if lb_id is not None:
+        return lb_id
+    if driver == "sqlite":
+        cur.execute("SELECT id FROM leaderboards WHERE name = ?", (leaderboard,))
+    else:
+        execute_prepared(cur, "leaderboard_by_name", "SELECT id FROM leaderboards WHERE name = %s", (leaderboard,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    schema_cache.set(key, row[0])
+    return row[0]
+
+
+# Polling clients hit /last-update constantly; a few seconds of staleness is fine
+last_update_cache = TTLCache(ttl=float(os.getenv("LAST_UPDATE_CACHE_TTL", "5")), maxsize=1)
+
+
+def fetch_last_update() -> Dict[str, object]:
+    """Return the newest update batch {update_id, ts}.
+    update_batch ids only grow, so this is a single primary-key probe rather than a scan.
+    """
+    cached = last_update_cache.get(("last_update",))
+    if cached is not None:
+        return cached
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, ts FROM update_batch ORDER BY id DESC LIMIT 1")
+        row = cur.fetchone()
+    payload = {"update_id": row[0], "ts": row[1]} if row else {"update_id": None, "ts": None}
+    last_update_cache.set(("last_update",), payload)
+    return payload
+
+
 def list_tables() -> List[str]:
     """List all leaderboard names (works for both PG and SQLite)."""
-    driver, _ = resolve_db_config()
-    with open_connection() as conn:
+    cached = schema_cache.get(("tables",))
+    if cached is not None:
+        return cached
+    with get_conn() as conn:
+        names = _list_tables(conn)
+    schema_cache.set(("tables",), names)
+    return names
+
+
+def _list_tables(conn) -> List[str]:
+    # Same statement on both drivers; sqlite3.Row and PG tuples both index by position
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM leaderboards ORDER BY name")
+    return [r[0] for r in cur.fetchall()]
+
+
+def _pivot_columns_sql(n_updates: int, ph: str, cast: str = "") -> str:
+    """One conditional-aggregate column per update id (bound in order), 0 when the player is missing."""
+    return ",\n".join(
+        f"COALESCE(MAX(CASE WHEN f.update_id = {ph} THEN f.points END), 0){cast}"
+        for _ in range(n_updates)
+    )
+
+
+def _fetch_table_data(conn, driver: str, leaderboard: str, limit: int, last_columns: int) -> Dict[str, List]:
+    """Pivot the latest `last_columns` updates of a leaderboard into player rows.
+    The pivot, sort by the newest column (DESC, then name) and LIMIT all run in SQL,
+    so only `limit` rows leave the database.
+    """
+    if driver == "sqlite":
         cur = conn.cursor()
-        if driver == "sqlite":
-            cur.execute(
-                "SELECT name FROM leaderboards ORDER BY name"
+        # Resolve leaderboard id
+        lb_id = lookup_leaderboard_id(cur, driver, leaderboard)
+        if lb_id is None:
+            return {"columns": [], "rows": []}
+
+        # Latest N distinct updates for this leaderboard (ids and timestamps)
+        cur.execute(
+            """
+            SELECT ub.id, ub.ts
+            FROM update_batch ub
+            WHERE EXISTS (
+              SELECT 1 FROM facts f
+              WHERE f.leaderboard_id = ? AND f.update_id = ub.id
             )
-            rows = cur.fetchall()
-            return [row["name"] for row in rows]
-        # postgres: read from leaderboards table too
+            ORDER BY ub.id DESC
+            LIMIT ?
+            """,
+            (lb_id, last_columns),
+        )
+        updates = cur.fetchall()
+        if not updates:
+            return {"columns": ["player"], "rows": []}
+        update_ids_desc = [u[0] for u in updates]
+        ts_headers_desc = [u[1] for u in updates]
+        update_ids = list(reversed(update_ids_desc))
+        ts_headers = list(reversed(ts_headers_desc))
+
+        # Bind the id list as one JSON parameter so the statement text doesn't depend on its length
         cur.execute(
-            "SELECT name FROM leaderboards ORDER BY name"
+            f"""
+            SELECT pl.name,
+                   {_pivot_columns_sql(len(update_ids), "?")}
+            FROM facts f
+            JOIN players pl ON pl.id = f.player_id
+            WHERE f.leaderboard_id = ?
+              AND f.update_id IN (SELECT value FROM json_each(?))
+            GROUP BY pl.name
+            ORDER BY {len(update_ids) + 1} DESC, 1
+            LIMIT ?
+            """,
+            [*update_ids, lb_id, json.dumps(update_ids), limit],
         )
-        return [r[0] for r in cur.fetchall()]
-
-
-def fetch_table_data(leaderboard: str, limit: int, last_columns: int) -> Dict[str, List]:
-    driver, _ = resolve_db_config()
-    if driver == "sqlite":
-        with open_connection() as conn:
-            cur = conn.cursor()
+        rows = [list(r) for r in cur.fetchall()]
+        return {"columns": ["player"] + ts_headers, "rows": rows}
+    else:
+        # Postgres branch
+        with conn.cursor() as cur:
             # Resolve leaderboard id
-            cur.execute("SELECT id FROM leaderboards WHERE name = ?", (leaderboard,))
-            row = cur.fetchone()
-            if not row:
+            lb_id = lookup_leaderboard_id(cur, driver, leaderboard)
+            if lb_id is None:
                 return {"columns": [], "rows": []}
-            lb_id = row[0]
-
-            # Latest N distinct updates for this leaderboard (ids and timestamps)
-            cur.execute(
+            # Latest N updates
+            execute_prepared(
+                cur,
+                "latest_updates",
                 """
                 SELECT ub.id, ub.ts
                 FROM update_batch ub
-                JOIN facts f ON f.update_id = ub.id
-                WHERE f.leaderboard_id = ?
-                GROUP BY ub.id, ub.ts
+                WHERE EXISTS (
+                  SELECT 1 FROM facts f
+                  WHERE f.leaderboard_id = %s AND f.update_id = ub.id
+                )
                 ORDER BY ub.id DESC
-                LIMIT ?
+                LIMIT %s
                 """,
                 (lb_id, last_columns),
             )
@@ -124,279 +392,267 @@ def fetch_table_data(leaderboard: str, limit: int, last_columns: int) -> Dict[st
             update_ids = list(reversed(update_ids_desc))
             ts_headers = list(reversed(ts_headers_desc))
 
-            placeholders_updates = ",".join(["?"] * len(update_ids))
+            # psycopg2 adapts the list to a bigint[] for = ANY(...)
             cur.execute(
-                (
-                    f"""
-                    SELECT pl.name, ub.ts, f.points
-                    FROM facts f
-                    JOIN players pl ON pl.id = f.player_id
-                    JOIN update_batch ub ON ub.id = f.update_id
-                    WHERE f.leaderboard_id = ?
-                      AND f.update_id IN ({placeholders_updates})
-                    """
-                ),
-                [lb_id, *update_ids],
+                f"""
+                SELECT pl.name,
+                       {_pivot_columns_sql(len(update_ids), "%s", "::double precision")}
+                FROM facts f
+                JOIN players pl ON pl.id = f.player_id
+                WHERE f.leaderboard_id = %s
+                  AND f.update_id = ANY(%s)
+                GROUP BY pl.name
+                ORDER BY {len(update_ids) + 1} DESC, 1
+                LIMIT %s
+                """,
+                tuple([*update_ids, lb_id, update_ids, limit]),
             )
-            all_points = cur.fetchall()
-            if not all_points:
-                return {"columns": ["player"] + ts_headers, "rows": []}
-
-            players = sorted({name for (name, _ts, _pts) in all_points})
-
-            points_map: Dict[str, Dict[str, float]] = {name: {ts: 0 for ts in ts_headers} for name in players}
-            for name, ts, pts in all_points:
-                if ts in points_map[name]:
-                    points_map[name][ts] = pts
-
-            rows = []
-            for name in players:
-                row = [name] + [points_map[name][ts] for ts in ts_headers]
-                rows.append(row)
-
-            rows.sort(key=lambda r: (r[-1] if r[-1] is not None else 0), reverse=True)
-            rows = rows[:limit]
-
+            rows = [list(r) for r in cur.fetchall()]
             return {"columns": ["player"] + ts_headers, "rows": rows}
-    else:
-        # Postgres branch
-        with open_connection() as conn:
-            with conn.cursor() as cur:
-                # Resolve leaderboard id
-                cur.execute("SELECT id FROM leaderboards WHERE name = %s", (leaderboard,))
-                row = cur.fetchone()
-                if not row:
-                    return {"columns": [], "rows": []}
-                lb_id = row[0]
-                # Latest N updates
-                cur.execute(
-                    """
-                    SELECT ub.id, ub.ts
-                    FROM update_batch ub
-                    JOIN facts f ON f.update_id = ub.id
-                    WHERE f.leaderboard_id = %s
-                    GROUP BY ub.id, ub.ts
-                    ORDER BY ub.id DESC
-                    LIMIT %s
-                    """,
-                    (lb_id, last_columns),
-                )
-                updates = cur.fetchall()
-                if not updates:
-                    return {"columns": ["player"], "rows": []}
-                update_ids_desc = [u[0] for u in updates]
-                ts_headers_desc = [u[1] for u in updates]
-                update_ids = list(reversed(update_ids_desc))
-                ts_headers = list(reversed(ts_headers_desc))
-
-                # Build IN placeholders
-                in_ph = ",".join(["%s"] * len(update_ids))
-                cur.execute(
-                    f"""
-                    SELECT pl.name, ub.ts, f.points
-                    FROM facts f
-                    JOIN players pl ON pl.id = f.player_id
-                    JOIN update_batch ub ON ub.id = f.update_id
-                    WHERE f.leaderboard_id = %s
-                      AND f.update_id IN ({in_ph})
-                    """,
-                    tuple([lb_id] + update_ids),
-                )
-                all_points = cur.fetchall()
-                if not all_points:
-                    return {"columns": ["player"] + ts_headers, "rows": []}
-
-                players = sorted({name for (name, _ts, _pts) in all_points})
-                points_map: Dict[str, Dict[str, float]] = {name: {ts: 0 for ts in ts_headers} for name in players}
-                for name, ts, pts in all_points:
-                    if ts in points_map[name]:
-                        points_map[name][ts] = float(pts) if pts is not None else 0
-
-                rows = []
-                for name in players:
-                    row = [name] + [points_map[name][ts] for ts in ts_headers]
-                    rows.append(row)
 
-                rows.sort(key=lambda r: (r[-1] if r[-1] is not None else 0), reverse=True)
-                rows = rows[:limit]
 
-                return {"columns": ["player"] + ts_headers, "rows": rows}
-
-
-def fetch_player_data(leaderboard: str, player_name: str) -> Dict[str, List]:
-    """Return pivoted data for a player across ALL updates of the given leaderboard.
+def _fetch_player_data(conn, driver: str, leaderboard: str, player_name: str, limit: int = 500) -> Dict[str, List]:
+    """Return pivoted data for a player across the latest `limit` updates of the given leaderboard.
     Columns: [player, ts1..tsN] oldest→newest; Row: [name, points...] with 0 for missing.
     Includes 'country' of the player.
     """
-    driver, _ = resolve_db_config()
     if driver == "sqlite":
-        with open_connection() as conn:
-            cur = conn.cursor()
-            # Resolve leaderboard id
-            cur.execute("SELECT id FROM leaderboards WHERE name = ?", (leaderboard,))
-            row = cur.fetchone()
-            if not row:
-                return {"columns": ["player"], "rows": [[player_name]], "country": None}
-            lb_id = row[0]
+        cur = conn.cursor()
+        # Resolve leaderboard id
+        lb_id = lookup_leaderboard_id(cur, driver, leaderboard)
+        if lb_id is None:
+            return {"columns": ["player"], "rows": [[player_name]], "country": None}
+
+        # Fetch country
+        cur.execute("SELECT country FROM players WHERE name = ?", (player_name,))
+        crow = cur.fetchone()
+        country = crow[0] if crow and crow[0] is not None else None
 
+        # Latest `limit` updates of this leaderboard and the player's points in each, in one query
+        cur.execute(
+            """
+            WITH latest AS (
+              SELECT ub.id, ub.ts
+              FROM update_batch ub
+              WHERE EXISTS (
+                SELECT 1 FROM facts f
+                WHERE f.leaderboard_id = ? AND f.update_id = ub.id
+              )
+              ORDER BY ub.id DESC
+              LIMIT ?
+            )
+            SELECT l.ts, COALESCE(f.points, 0)
+            FROM latest l
+            LEFT JOIN facts f
+              ON f.update_id = l.id
+             AND f.leaderboard_id = ?
+             AND f.player_id = (SELECT id FROM players WHERE name = ?)
+            ORDER BY l.id
+            """,
+            (lb_id, limit, lb_id, player_name),
+        )
+        ts_headers = []
+        points_row = []
+        for ts, pts in cur:
+            ts_headers.append(ts)
+            points_row.append(pts)
+        return {"columns": ["player"] + ts_headers, "rows": [[player_name] + points_row], "country": country}
+    else:
+        with conn.cursor() as cur:
+            lb_id = lookup_leaderboard_id(cur, driver, leaderboard)
+            if lb_id is None:
+                return {"columns": ["player"], "rows": [[player_name]], "country": None}
             # Fetch country
-            cur.execute("SELECT country FROM players WHERE name = ?", (player_name,))
+            execute_prepared(cur, "player_country", "SELECT country FROM players WHERE name = %s", (player_name,))
             crow = cur.fetchone()
             country = crow[0] if crow and crow[0] is not None else None
 
-            # Get all update ids and timestamps for this leaderboard (only those that appear in facts)
-            cur.execute(
+            execute_prepared(
+                cur,
+                "player_history",
                 """
-                SELECT ub.id, ub.ts
-                FROM update_batch ub
-                JOIN facts f ON f.update_id = ub.id
-                WHERE f.leaderboard_id = ?
-                GROUP BY ub.id, ub.ts
-                ORDER BY ub.id ASC
+                WITH latest AS (
+                  SELECT ub.id, ub.ts
+                  FROM update_batch ub
+                  WHERE EXISTS (
+                    SELECT 1 FROM facts f
+                    WHERE f.leaderboard_id = %s AND f.update_id = ub.id
+                  )
+                  ORDER BY ub.id DESC
+                  LIMIT %s
+                )
+                SELECT l.ts, COALESCE(f.points, 0)::double precision
+                FROM latest l
+                LEFT JOIN facts f
+                  ON f.update_id = l.id
+                 AND f.leaderboard_id = %s
+                 AND f.player_id = (SELECT id FROM players WHERE name = %s)
+                ORDER BY l.id
                 """,
-                (lb_id,),
-            )
-            updates = cur.fetchall()
-            if not updates:
-                return {"columns": ["player"], "rows": [[player_name]], "country": country}
-            update_ids = [u[0] for u in updates]
-            ts_headers = [u[1] for u in updates]
-
-            # Fetch player's points for those updates
-            placeholders = ",".join(["?"] * len(update_ids))
-            cur.execute(
-                (
-                    f"""
-                    SELECT f.update_id, f.points
-                    FROM facts f
-                    JOIN players pl ON pl.id = f.player_id
-                    WHERE f.leaderboard_id = ? AND pl.name = ? AND f.update_id IN ({placeholders})
-                    """
-                ),
-                [lb_id, player_name, *update_ids],
+                (lb_id, limit, lb_id, player_name),
             )
-            pts_by_update = {uid: 0 for uid in update_ids}
-            for uid, pts in cur.fetchall():
-                pts_by_update[uid] = pts
-
-            points_row = [pts_by_update[uid] for uid in update_ids]
+            ts_headers = []
+            points_row = []
+            for ts, pts in cur:
+                ts_headers.append(ts)
+                points_row.append(pts)
             return {"columns": ["player"] + ts_headers, "rows": [[player_name] + points_row], "country": country}
-    else:
-        with open_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT id FROM leaderboards WHERE name = %s", (leaderboard,))
-                row = cur.fetchone()
-                if not row:
-                    return {"columns": ["player"], "rows": [[player_name]], "country": None}
-                lb_id = row[0]
-                # Fetch country
-                cur.execute("SELECT country FROM players WHERE name = %s", (player_name,))
-                crow = cur.fetchone()
-                country = crow[0] if crow and crow[0] is not None else None
-
-                cur.execute(
-                    """
-                    SELECT ub.id, ub.ts
-                    FROM update_batch ub
-                    JOIN facts f ON f.update_id = ub.id
-                    WHERE f.leaderboard_id = %s
-                    GROUP BY ub.id, ub.ts
-                    ORDER BY ub.id ASC
-                    """,
-                    (lb_id,),
-                )
-                updates = cur.fetchall()
-                if not updates:
-                    return {"columns": ["player"], "rows": [[player_name]], "country": country}
-                update_ids = [u[0] for u in updates]
-                ts_headers = [u[1] for u in updates]
-                in_ph = ",".join(["%s"] * len(update_ids))
-                cur.execute(
-                    f"""
-                    SELECT f.update_id, f.points
-                    FROM facts f
-                    JOIN players pl ON pl.id = f.player_id
-                    WHERE f.leaderboard_id = %s AND pl.name = %s AND f.update_id IN ({in_ph})
-                    """,
-                    tuple([lb_id, player_name] + update_ids),
-                )
-                pts_by_update = {uid: 0 for uid in update_ids}
-                for uid, pts in cur.fetchall():
-                    pts_by_update[uid] = float(pts) if pts is not None else 0
-                points_row = [pts_by_update[uid] for uid in update_ids]
-                return {"columns": ["player"] + ts_headers, "rows": [[player_name] + points_row], "country": country}
 
 
-def fetch_top_players(leaderboard: str, limit: int = 50) -> List[str]:
-    driver, _ = resolve_db_config()
+def _fetch_top_players(conn, driver: str, leaderboard: str, limit: int = 50) -> List[str]:
     if driver == "sqlite":
-        with open_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT id FROM leaderboards WHERE name = ?", (leaderboard,))
-            row = cur.fetchone()
-            if not row:
+        cur = conn.cursor()
+        lb_id = lookup_leaderboard_id(cur, driver, leaderboard)
+        if lb_id is None:
+            return []
+        cur.execute(
+            """
+            WITH daily AS (
+              -- Semi-join: one index probe per batch instead of expanding every fact row
+              SELECT MAX(ub.id) AS update_id
+              FROM update_batch ub
+              WHERE time(ub.ts) < '21:00:00'
+                AND EXISTS (
+                  SELECT 1 FROM facts f
+                  WHERE f.leaderboard_id = ? AND f.update_id = ub.id
+                )
+              GROUP BY date(ub.ts)
+            ),
+            totals AS (
+              -- Aggregate on integer ids; only the top rows are joined to players
+              SELECT f.player_id, SUM(f.points) AS total
+              FROM facts f
+              JOIN daily d ON d.update_id = f.update_id
+              WHERE f.leaderboard_id = ?
+              GROUP BY f.player_id
+              ORDER BY total DESC
+              LIMIT ?
+            )
+            SELECT pl.name, t.total
+            FROM totals t
+            JOIN players pl ON pl.id = t.player_id
+            ORDER BY t.total DESC
+            """,
+            (lb_id, lb_id, limit),
+        )
+        rows = cur.fetchall()
+        return [r[0] for r in rows]
+    else:
+        with conn.cursor() as cur:
+            lb_id = lookup_leaderboard_id(cur, driver, leaderboard)
+            if lb_id is None:
                 return []
-            lb_id = row[0]
-            cur.execute(
+            execute_prepared(
+                cur,
+                "top_players",
                 """
                 WITH daily AS (
-                  SELECT date(ub.ts) AS d, MAX(ub.id) AS update_id
+                  SELECT MAX(ub.id) AS update_id
                   FROM update_batch ub
-                  JOIN facts f ON f.update_id = ub.id
-                  WHERE f.leaderboard_id = ?
-                    AND time(ub.ts) < '21:00:00'
-                  GROUP BY date(ub.ts)
+                  -- Same expressions as idx_update_batch_day_cutoff so the partial index applies
+                  WHERE ((ub.ts AT TIME ZONE 'UTC')::time) < TIME '08:00:00'
+                    AND EXISTS (
+                      SELECT 1 FROM facts f
+                      WHERE f.leaderboard_id = %s AND f.update_id = ub.id
+                    )
+                  GROUP BY date_trunc('day', ub.ts AT TIME ZONE 'UTC')
+                ),
+                totals AS (
+                  SELECT f.player_id, SUM(f.points) AS total
+                  FROM facts f
+                  JOIN daily d ON d.update_id = f.update_id
+                  WHERE f.leaderboard_id = %s
+                  GROUP BY f.player_id
+                  ORDER BY total DESC
+                  LIMIT %s
                 )
-                SELECT pl.name, SUM(f.points) AS total
-                FROM facts f
-                JOIN daily d     ON d.update_id = f.update_id
-                JOIN players pl  ON pl.id = f.player_id
-                WHERE f.leaderboard_id = ?
-                GROUP BY pl.name
-                ORDER BY total DESC
-                LIMIT ?
+                SELECT COALESCE(json_agg(pl.name ORDER BY t.total DESC), '[]'::json)
+                FROM totals t
+                JOIN players pl ON pl.id = t.player_id
                 """,
                 (lb_id, lb_id, limit),
             )
-            rows = cur.fetchall()
-            return [r[0] for r in rows]
-    else:
-        with open_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT id FROM leaderboards WHERE name = %s", (leaderboard,))
-                row = cur.fetchone()
-                if not row:
-                    return []
-                lb_id = row[0]
-                cur.execute(
-                    """
-                    WITH daily AS (
-                      SELECT date_trunc('day', ub.ts) AS d, MAX(ub.id) AS update_id
-                      FROM update_batch ub
-                      JOIN facts f ON f.update_id = ub.id
-                      WHERE f.leaderboard_id = %s
-                        AND (ub.ts::time) < TIME '8:00:00'
-                      GROUP BY date_trunc('day', ub.ts)
-                    )
-                    SELECT pl.name, SUM(f.points) AS total
-                    FROM facts f
-                    JOIN daily d    ON d.update_id = f.update_id
-                    JOIN players pl ON pl.id = f.player_id
-                    WHERE f.leaderboard_id = %s
-                    GROUP BY pl.name
-                    ORDER BY total DESC
-                    LIMIT %s
-                    """,
-                    (lb_id, lb_id, limit),
-                )
-                rows = cur.fetchall()
-                return [r[0] for r in rows]
+            # Postgres builds the JSON array; psycopg2 hands it back as one Python list
+            return cur.fetchone()[0]
+
+
+# Thin wrappers: one pooled connection per call. Callers that need several of the
+# queries above (e.g. /overview) check out a single connection and use the _fetch_* helpers.
+
+def fetch_table_data(leaderboard: str, limit: int, last_columns: int) -> Dict[str, List]:
+    driver, _ = resolve_db_config()
+    with get_conn() as conn:
+        return _fetch_table_data(conn, driver, leaderboard, limit, last_columns)
+
+
+def fetch_player_data(leaderboard: str, player_name: str, limit: int = 500) -> Dict[str, List]:
+    driver, _ = resolve_db_config()
+    with get_conn() as conn:
+        return _fetch_player_data(conn, driver, leaderboard, player_name, limit)
+
+
+def fetch_top_players(leaderboard: str, limit: int = 50) -> List[str]:
+    driver, _ = resolve_db_config()
+    with get_conn() as conn:
+        return _fetch_top_players(conn, driver, leaderboard, limit)
+
+
+def fetch_overview(leaderboard: str, limit: int, last_columns: int, top_limit: int) -> Dict[str, object]:
+    """/data and /top-players payloads built on one connection checkout."""
+    driver, _ = resolve_db_config()
+    with get_conn() as conn:
+        return {
+            "data": _fetch_table_data(conn, driver, leaderboard, limit, last_columns),
+            "top_players": _fetch_top_players(conn, driver, leaderboard, top_limit),
+        }
 
 
 
 app = Flask(__name__)
 CORS(app)
 
+def _orjson_default(obj):
+    """Match flask.jsonify's encoding for types orjson leaves to us."""
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return http_date(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(payload) -> bytes:
+    """Serialize a payload to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return jsonify(payload).get_data()
+
+
+def ojsonify(payload):
+    """Drop-in for jsonify() on the row-heavy endpoints."""
+    return app.response_class(dumps_json(payload), mimetype="application/json")
+
+
+# Serialized read payloads; keys carry the newest update id so a fresh scrape invalidates them
+response_cache = TTLCache(ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30")), maxsize=512)
+
+
+def cached_json(key: tuple, producer):
+    """Return a JSON response for `key`, calling producer() only on a cache miss.
+    Responses carry an ETag and Cache-Control so clients can revalidate (304) or reuse them.
+    """
+    full_key = key + (fetch_last_update()["update_id"],)
+    entry = response_cache.get(full_key)
+    if entry is None:
+        body = dumps_json(producer())
+        entry = (body, hashlib.sha1(body).hexdigest())
+        response_cache.set(full_key, entry)
+    body, etag = entry
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = int(response_cache.ttl)
+    return response.make_conditional(request)
+
 
 @app.get("/health")
 def health():
@@ -406,11 +662,38 @@ def health():
 @app.get("/tables")
 def api_tables():
     try:
-        return jsonify(list_tables())
+        # Clients poll this list; answer 304 when their If-None-Match is still current
+        response = ojsonify(list_tables())
+        response.add_etag()
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.get("/last-update")
+def api_last_update():
+    try:
+        return ojsonify(fetch_last_update())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Shared secret for /admin endpoints; with none configured they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+@app.post("/admin/flush-schema-cache")
+def api_flush_schema_cache():
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Forbidden"}), 403
+    schema_cache.clear()
+    response_cache.clear()
+    # Response cache keys include the newest update id, so drop that too for the flush to bite now
+    last_update_cache.clear()
+    return jsonify({"status": "ok"})
+
+
 @app.get("/tables/<leaderboard>/data")
 def api_table_data(leaderboard: str):
     
@@ -419,20 +702,41 @@ def api_table_data(leaderboard: str):
         limit = int(request.args.get("limit", 16))
         last_cols = int(request.args.get("columns", 4))
         
-        payload = fetch_table_data(leaderboard, limit=limit, last_columns=last_cols)
-        return jsonify(payload)
+        return cached_json(
+            ("data", leaderboard, limit, last_cols),
+            lambda: fetch_table_data(leaderboard, limit=limit, last_columns=last_cols),
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.get("/tables/<leaderboard>/overview")
+def api_table_overview(leaderboard: str):
+    """/data and /top-players in one response, for views that load both together."""
+    try:
+        limit = int(request.args.get("limit", 16))
+        last_cols = int(request.args.get("columns", 4))
+        top_limit = int(request.args.get("top", 50))
+
+        return cached_json(
+            ("overview", leaderboard, limit, last_cols, top_limit),
+            lambda: fetch_overview(leaderboard, limit=limit, last_columns=last_cols, top_limit=top_limit),
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
 @app.get("/tables/<table>/player")
 def api_table_player(table: str):
     try:
         name = request.args.get("name")
         if not name:
             return jsonify({"error": "Missing required query parameter 'name'"}), 400
+        limit = int(request.args.get("limit", 500))
 
-        payload = fetch_player_data(table, player_name=name)
-        return jsonify(payload)
+        return cached_json(
+            ("player", table, name, limit),
+            lambda: fetch_player_data(table, player_name=name, limit=limit),
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -441,8 +745,10 @@ def api_table_player(table: str):
 def api_top_players(table: str):
     try:
         limit = int(request.args.get("limit", 50))
-        player_names = fetch_top_players(table, limit=limit)
-        return jsonify(player_names)
+        return cached_json(
+            ("top-players", table, limit),
+            lambda: fetch_top_players(table, limit=limit),
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
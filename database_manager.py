@@ -6,14 +6,33 @@ Uses SQLite locally, PostgreSQL in cloud
 
 import os
 import datetime
+import json
 import re
-from typing import List, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional
+
+_TABLE_NAME_DISALLOWED = re.compile(r'[^a-zA-Z0-9_\s-]')
+_TABLE_NAME_SEPARATORS = str.maketrans({' ': '_', '-': '_'})
+
+
+@lru_cache(maxsize=4096)
+def _sanitize_table_name(name: str) -> str:
+    """Sanitize table name for SQLite/PostgreSQL compatibility"""
+    # '$' and '.' are already stripped by the pattern, so only separators need mapping
+    return _TABLE_NAME_DISALLOWED.sub('', name).translate(_TABLE_NAME_SEPARATORS)
+
 
 class DatabaseManager:
     def __init__(self, db_path: str = None):
         """
         Initialize database manager - auto-detects environment
         """
+        # Set while a snapshot is being written; helpers then leave committing to end_batch()
+        self._in_batch = False
+        # Ids never change once created, so repeat lookups within a run skip the database
+        self._leaderboard_ids = {}
+        self._player_ids = {}
+
         # Check if we're in cloud (Railway/Render) or local
         self.database_url = os.getenv('DATABASE_URL')
         
@@ -47,6 +66,8 @@ class DatabaseManager:
                 user=url.username,
                 password=url.password
             )
+            # One cursor serves every helper call; the manager is used from a single thread
+            self._cursor = self.connection.cursor()
             
             # Create tables if they don't exist
             self.create_postgres_tables()
@@ -64,6 +85,19 @@ class DatabaseManager:
             import sqlite3
             self.connection = sqlite3.connect(self.db_path)
             self.connection.execute("PRAGMA foreign_keys = ON")
+            # WAL lets the API read while the scraper writes, and with synchronous=NORMAL
+            # commits no longer fsync the main database file each time
+            if self.db_path != ":memory:":
+                mode = self.connection.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+                if mode.lower() != "wal":
+                    print(f"⚠️ SQLite journal_mode is {mode}, not WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+            self.connection.execute("PRAGMA temp_store = MEMORY")
+            self.connection.execute("PRAGMA cache_size = -65536")
+            self.connection.execute("PRAGMA mmap_size = 268435456")
+            self.connection.execute("PRAGMA busy_timeout = 5000")
+            # One cursor serves every helper call; the manager is used from a single thread
+            self._cursor = self.connection.cursor()
             self.create_sqlite_tables()
         except Exception as e:
             print(f"❌ Error initializing SQLite: {e}")
@@ -105,8 +139,21 @@ class DatabaseManager:
                     PRIMARY KEY (leaderboard_id, player_id, update_id)
                 )
             """)
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_update ON facts (leaderboard_id, update_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_player_update ON facts (leaderboard_id, player_id, update_id)")
+            # (leaderboard_id, update_id, points DESC) serves both the per-update scans and
+            # top-N ordering by points, so it supersedes the old (leaderboard_id, update_id) index
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_update_points ON facts (leaderboard_id, update_id, points DESC)")
+            cursor.execute("DROP INDEX IF EXISTS idx_facts_lb_update")
+            # The primary key already indexes (leaderboard_id, player_id, update_id); carrying points
+            # in the leaf makes per-player history reads index-only
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_player_update_pts ON facts (leaderboard_id, player_id, update_id) INCLUDE (points)")
+            cursor.execute("DROP INDEX IF EXISTS idx_facts_lb_player_update")
+            # Partial index over the daily cutoff batches that top-players sums; the expressions must
+            # match the API query verbatim. ts is TIMESTAMPTZ, so it is pinned to UTC to be immutable
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_update_batch_day_cutoff
+                ON update_batch (date_trunc('day', ts AT TIME ZONE 'UTC'), id)
+                WHERE ((ts AT TIME ZONE 'UTC')::time) < TIME '08:00:00'
+            """)
             
             self.connection.commit()
             print("✅ PostgreSQL tables created")
@@ -153,8 +200,21 @@ class DatabaseManager:
                     FOREIGN KEY (update_id) REFERENCES update_batch(id) ON DELETE CASCADE
                 )
             """)
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_update ON facts (leaderboard_id, update_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_player_update ON facts (leaderboard_id, player_id, update_id)")
+            # (leaderboard_id, update_id, points DESC) serves both the per-update scans and
+            # top-N ordering by points, so it supersedes the old (leaderboard_id, update_id) index
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_update_points ON facts (leaderboard_id, update_id, points DESC)")
+            cursor.execute("DROP INDEX IF EXISTS idx_facts_lb_update")
+            # The primary key already indexes (leaderboard_id, player_id, update_id); appending points
+            # makes per-player history reads covering
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_facts_lb_player_update_pts ON facts (leaderboard_id, player_id, update_id, points)")
+            cursor.execute("DROP INDEX IF EXISTS idx_facts_lb_player_update")
+            # Partial index over the daily cutoff batches that top-players sums; the expressions must
+            # match the API query verbatim
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_update_batch_day_cutoff
+                ON update_batch (date(ts), id)
+                WHERE time(ts) < '21:00:00'
+            """)
             
             self.connection.commit()
             print("✅ SQLite tables created")
@@ -162,51 +222,172 @@ class DatabaseManager:
             print(f"❌ Error creating SQLite tables: {e}")
             raise
 
+    # ---- Batching ----
+    def begin_batch(self):
+        """Start one transaction for a whole snapshot instead of committing per row"""
+        if not self.use_postgres:
+            # Take the write lock up front rather than failing to upgrade mid-batch
+            self.connection.execute("BEGIN IMMEDIATE")
+        self._in_batch = True
+
+    def end_batch(self):
+        """Commit everything written since begin_batch()"""
+        self._in_batch = False
+        if self.use_postgres:
+            from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+
+            if self.connection.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+                # COMMIT would silently roll back; make it explicit and drop ids created in the batch
+                print("⚠️ Batch failed, rolling back")
+                self.connection.rollback()
+                self._forget_ids()
+                return
+        try:
+            self.connection.commit()
+        except Exception:
+            # A failed COMMIT (e.g. SQLITE_BUSY) leaves the transaction open; end it so the
+            # next begin_batch() can start a fresh one
+            self.abort_batch()
+            raise
+
+    def abort_batch(self):
+        """Roll back everything written since begin_batch(), e.g. after the snapshot failed half-way"""
+        self._in_batch = False
+        try:
+            self.connection.rollback()
+        finally:
+            # Ids created inside the batch no longer exist
+            self._forget_ids()
+
+    def ensure_connection(self):
+        """Reconnect to PostgreSQL if the connection was closed or dropped while idle"""
+        if not self.use_postgres:
+            return
+        try:
+            if not self.connection.closed:
+                self._cursor.execute("SELECT 1")
+                self._cursor.fetchone()
+                # Don't leave the probe's transaction open between runs
+                self.connection.rollback()
+                return
+        except Exception as e:
+            print(f"⚠️ PostgreSQL connection check failed: {e}")
+        print("🔌 Reconnecting to PostgreSQL...")
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self._forget_ids()
+        self.init_postgres()
+
+    def _forget_ids(self):
+        self._leaderboard_ids.clear()
+        self._player_ids.clear()
+
+    def _commit(self):
+        if not self._in_batch:
+            self.connection.commit()
+
     # ---- Normalized helpers (generic wrappers) ----
     def get_or_create_leaderboard_id(self, name: str) -> int:
+        lb_id = self._leaderboard_ids.get(name)
+        if lb_id is None:
+            lb_id = self._upsert_leaderboard(name)
+            self._leaderboard_ids[name] = lb_id
+        return lb_id
+
+    def _upsert_leaderboard(self, name: str) -> int:
         if self.use_postgres:
             return self._get_or_create_leaderboard_id_pg(name)
-        # SQLite path (existing behavior)
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT id FROM leaderboards WHERE name = ?", (name,))
-        row = cursor.fetchone()
-        if row:
-            return row[0]
-        cursor.execute("INSERT INTO leaderboards (name) VALUES (?)", (name,))
-        self.connection.commit()
-        return cursor.lastrowid
+        # SQLite path: one UPSERT ... RETURNING (SQLite >= 3.35), mirroring the PG variant
+        cursor = self._cursor
+        cursor.execute(
+            """
+            INSERT INTO leaderboards (name)
+            VALUES (?)
+            ON CONFLICT (name) DO UPDATE SET name = excluded.name
+            RETURNING id
+            """,
+            (name,),
+        )
+        lb_id = cursor.fetchone()[0]
+        self._commit()
+        return lb_id
 
     def get_or_create_player_id(self, name: str, country: Optional[str]) -> int:
+        player_id = self._player_ids.get(name)
+        if player_id is not None:
+            return player_id
+        player_id, stored_country = self._upsert_player(name, country)
+        # Only cache once the country is known; until then later calls may still fill it in
+        if stored_country is not None:
+            self._player_ids[name] = player_id
+        return player_id
+
+    def _upsert_player(self, name: str, country: Optional[str]) -> Tuple[int, Optional[str]]:
         if self.use_postgres:
             return self._get_or_create_player_id_pg(name, country)
-        # SQLite path
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT id, country FROM players WHERE name = ?", (name,))
-        row = cursor.fetchone()
-        if row:
-            player_id, existing_country = row
-            if (not existing_country) and country:
-                cursor.execute("UPDATE players SET country = ? WHERE id = ?", (country, player_id))
-                self.connection.commit()
-            return player_id
-        cursor.execute("INSERT INTO players (name, country) VALUES (?, ?)", (name, country))
-        self.connection.commit()
-        return cursor.lastrowid
+        # SQLite path: fill in a missing country without overwriting a known one
+        cursor = self._cursor
+        cursor.execute(
+            """
+            INSERT INTO players (name, country)
+            VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET country = COALESCE(players.country, excluded.country)
+            RETURNING id, country
+            """,
+            (name, country),
+        )
+        player_id, stored_country = cursor.fetchone()
+        self._commit()
+        return player_id, stored_country
+
+    def get_or_create_player_ids(self, players: List[Tuple[str, Optional[str]]]) -> Dict[str, int]:
+        """Resolve many (name, country) pairs to player ids with one statement for the uncached names"""
+        ids = {}
+        pending = {}
+        for name, country in players:
+            if name in self._player_ids:
+                ids[name] = self._player_ids[name]
+            elif pending.get(name) is None:
+                # First known country wins, as with repeated get_or_create_player_id calls
+                pending[name] = country
+        if pending:
+            if self.use_postgres:
+                rows = self._upsert_players_pg(pending)
+            else:
+                self._cursor.execute(
+                    """
+                    INSERT INTO players (name, country)
+                    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]')
+                    FROM json_each(?) WHERE true
+                    ON CONFLICT (name) DO UPDATE SET country = COALESCE(players.country, excluded.country)
+                    RETURNING name, id, country
+                    """,
+                    (json.dumps(list(pending.items())),),
+                )
+                rows = self._cursor.fetchall()
+                self._commit()
+            for name, player_id, stored_country in rows:
+                ids[name] = player_id
+                if stored_country is not None:
+                    self._player_ids[name] = player_id
+        return ids
 
     def create_update_batch(self, ts: str) -> int:
         if self.use_postgres:
             return self._create_update_batch_pg(ts)
         # SQLite path
-        cursor = self.connection.cursor()
+        cursor = self._cursor
         cursor.execute("INSERT INTO update_batch (ts) VALUES (?)", (ts,))
-        self.connection.commit()
+        self._commit()
         return cursor.lastrowid
 
     def insert_fact(self, leaderboard_id: int, update_id: int, player_id: int, points: float):
         if self.use_postgres:
             return self._insert_fact_pg(leaderboard_id, update_id, player_id, points)
         # SQLite path
-        cursor = self.connection.cursor()
+        cursor = self._cursor
         cursor.execute(
             """
             INSERT INTO facts (leaderboard_id, update_id, player_id, points)
@@ -216,10 +397,28 @@ class DatabaseManager:
             """,
             (leaderboard_id, update_id, player_id, points),
         )
-        self.connection.commit()
+        self._commit()
     
+    def insert_facts(self, rows: List[Tuple[int, int, int, float]]):
+        """Upsert many (leaderboard_id, update_id, player_id, points) rows in one call"""
+        if not rows:
+            return
+        if self.use_postgres:
+            return self._insert_facts_pg(rows)
+        # SQLite path
+        self._cursor.executemany(
+            """
+            INSERT INTO facts (leaderboard_id, update_id, player_id, points)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(leaderboard_id, player_id, update_id)
+            DO UPDATE SET points = excluded.points
+            """,
+            rows,
+        )
+        self._commit()
+
     def _get_or_create_leaderboard_id_pg(self, name: str) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
         cursor.execute(
             """
             INSERT INTO leaderboards (name)
@@ -230,36 +429,55 @@ class DatabaseManager:
             (name,),
         )
         lb_id = cursor.fetchone()[0]
-        self.connection.commit()
+        self._commit()
         return lb_id
 
-    def _get_or_create_player_id_pg(self, name: str, country: Optional[str]) -> int:
-        cursor = self.connection.cursor()
+    def _get_or_create_player_id_pg(self, name: str, country: Optional[str]) -> Tuple[int, Optional[str]]:
+        cursor = self._cursor
         cursor.execute(
             """
             INSERT INTO players (name, country)
             VALUES (%s, %s)
             ON CONFLICT (name) DO UPDATE SET country = COALESCE(players.country, EXCLUDED.country)
-            RETURNING id
+            RETURNING id, country
             """,
             (name, country),
         )
-        player_id = cursor.fetchone()[0]
-        self.connection.commit()
-        return player_id
+        player_id, stored_country = cursor.fetchone()
+        self._commit()
+        return player_id, stored_country
+
+    def _upsert_players_pg(self, pending: Dict[str, Optional[str]]) -> List[Tuple[str, int, Optional[str]]]:
+        from psycopg2.extras import execute_values
+
+        # Names are unique in `pending`, so one multi-row ON CONFLICT never touches a row twice
+        rows = execute_values(
+            self._cursor,
+            """
+            INSERT INTO players (name, country)
+            VALUES %s
+            ON CONFLICT (name) DO UPDATE SET country = COALESCE(players.country, EXCLUDED.country)
+            RETURNING name, id, country
+            """,
+            list(pending.items()),
+            page_size=1000,
+            fetch=True,
+        )
+        self._commit()
+        return rows
 
     def _create_update_batch_pg(self, ts: str) -> int:
-        cursor = self.connection.cursor()
+        cursor = self._cursor
         cursor.execute(
             "INSERT INTO update_batch (ts) VALUES (%s) RETURNING id",
             (ts,),
         )
         update_id = cursor.fetchone()[0]
-        self.connection.commit()
+        self._commit()
         return update_id
 
     def _insert_fact_pg(self, leaderboard_id: int, update_id: int, player_id: int, points: float):
-        cursor = self.connection.cursor()
+        cursor = self._cursor
         cursor.execute(
             """
             INSERT INTO facts (leaderboard_id, update_id, player_id, points)
@@ -269,7 +487,24 @@ class DatabaseManager:
             """,
             (leaderboard_id, update_id, player_id, points),
         )
-        self.connection.commit()
+        self._commit()
+    
+    def _insert_facts_pg(self, rows: List[Tuple[int, int, int, float]]):
+        from psycopg2.extras import execute_values
+
+        # One multi-row INSERT per page instead of a round-trip per fact
+        execute_values(
+            self._cursor,
+            """
+            INSERT INTO facts (leaderboard_id, update_id, player_id, points)
+            VALUES %s
+            ON CONFLICT (leaderboard_id, player_id, update_id)
+            DO UPDATE SET points = EXCLUDED.points
+            """,
+            rows,
+            page_size=1000,
+        )
+        self._commit()
     
     def get_leaderboard_table_name(self, game: str, blind_level: str) -> str:
         """Get or create leaderboard table for game/blind level"""
@@ -282,82 +517,13 @@ class DatabaseManager:
     # --- Name sanitizers (restored) ---
     def _sanitize_table_name(self, name: str) -> str:
         """Sanitize table name for SQLite/PostgreSQL compatibility"""
-        sanitized = re.sub(r'[^a-zA-Z0-9_\s-]', '', name)
-        sanitized = sanitized.replace(' ', '_').replace('-', '_')
-        sanitized = sanitized.replace('$', 'dollar').replace('.', 'dot')
-        return sanitized
-
-    def _sanitize_column_name(self, timestamp: str) -> str:
-        """Sanitize timestamp for use as a column name"""
-        sanitized = timestamp.replace(' ', '_').replace(':', 'h').replace('-', '_')
-        sanitized = f"ts_{sanitized}"
-        return sanitized
-
-    # --- Timestamp pruning helpers ---
-    def _get_sqlite_timestamp_columns(self, table_name: str) -> List[str]:
-        cursor = self.connection.cursor()
-        cursor.execute(f"PRAGMA table_info('{table_name}')")
-        all_columns = [col[1] for col in cursor.fetchall()]
-        ts_columns = [c for c in all_columns if c.startswith("ts_")]
-        ts_columns.sort()
-        return ts_columns
-
-    def _prune_sqlite_timestamp_columns(self, table_name: str, max_columns: int):
-        try:
-            ts_columns = self._get_sqlite_timestamp_columns(table_name)
-            if len(ts_columns) <= max_columns:
-                return
-            to_drop = len(ts_columns) - max_columns
-            columns_to_drop = ts_columns[:to_drop]
-            cursor = self.connection.cursor()
-            for col in columns_to_drop:
-                try:
-                    cursor.execute(f"ALTER TABLE \"{table_name}\" DROP COLUMN \"{col}\"")
-                    print(f"    🗑️ Dropped old column: {col}")
-                except Exception as drop_err:
-                    print(f"    ⚠️ Could not drop column {col}: {drop_err}")
-                    break
-            self.connection.commit()
-        except Exception as e:
-            print(f"    ⚠️ Error during pruning timestamp columns (SQLite): {e}")
-
-    def _get_postgres_timestamp_columns(self, table_name: str) -> List[str]:
-        cursor = self.connection.cursor()
-        cursor.execute(
-            """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_name = %s AND column_name LIKE 'ts_%'
-            ORDER BY column_name ASC
-            """,
-            (table_name,),
-        )
-        rows = cursor.fetchall()
-        return [r[0] for r in rows]
+        return _sanitize_table_name(name)
 
-    def _prune_postgres_timestamp_columns(self, table_name: str, max_columns: int):
-        try:
-            ts_columns = self._get_postgres_timestamp_columns(table_name)
-            if len(ts_columns) <= max_columns:
-                return
-            to_drop = len(ts_columns) - max_columns
-            columns_to_drop = ts_columns[:to_drop]
-            cursor = self.connection.cursor()
-            for col in columns_to_drop:
-                try:
-                    cursor.execute(f"ALTER TABLE \"{table_name}\" DROP COLUMN \"{col}\"")
-                    print(f"    🗑️ Dropped old column: {col}")
-                except Exception as drop_err:
-                    print(f"    ⚠️ Could not drop column {col}: {drop_err}")
-                    break
-            self.connection.commit()
-        except Exception as e:
-            print(f"    ⚠️ Error during pruning timestamp columns (PostgreSQL): {e}")
-    
     def close(self):
         """Close database connection"""
         if hasattr(self, 'connection') and self.connection:
             self.connection.close()
+            self._forget_ids()
             print("🔒 Database connection closed")
 
 
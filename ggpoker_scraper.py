@@ -12,6 +12,7 @@ from database_manager import DatabaseManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.options import Options
@@ -28,6 +29,46 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Where the resolved chromedriver path is remembered between runs
+DRIVER_PATH_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ggpoker")
+
+# Third-party trackers and fonts the scraper never needs (images are blocked via prefs)
+BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*facebook.net*",
+    "*hotjar.com*",
+    "*.woff",
+    "*.woff2",
+]
+
+# Shared explicit-wait settings; polling faster than Selenium's 0.5 s default returns sooner
+WAIT_TIMEOUT = float(os.getenv("WAIT_TIMEOUT", "10"))
+WAIT_POLL_SECONDS = 0.2
+# Shorter waits whose timeout is an expected outcome: the dropdown may not open, and
+# picking the level already shown leaves the old rows in place
+DROPDOWN_OPEN_TIMEOUT = float(os.getenv("DROPDOWN_OPEN_TIMEOUT", "5"))
+ROWS_REFRESH_TIMEOUT = float(os.getenv("ROWS_REFRESH_TIMEOUT", "7"))
+
+# Locators used across the scraping steps
+DROPDOWN_LOCATOR = (By.CLASS_NAME, "dropdown-layer")
+BLIND_TEXT_LOCATOR = (By.CLASS_NAME, "blind-text")
+RANKING_BODY_LOCATOR = (By.CLASS_NAME, "playerRankingBody")
+RANKING_ROW_LOCATOR = (By.CSS_SELECTOR, ".playerRankingBody tr")
+
+# Reads every ranking row in one round-trip: [td count, name, country (span data-title), points]
+RANKING_ROWS_JS = """
+return Array.from(arguments[0].querySelectorAll('tr'), function (tr) {
+    var td = tr.querySelectorAll('td');
+    if (td.length < 4) {
+        return [td.length, null, null, null];
+    }
+    var span = td[2].querySelector('span');
+    return [td.length, td[1].textContent, span ? span.getAttribute('data-title') : null, td[3].textContent];
+});
+"""
+
 class GGPokerScraper:
     def __init__(self, headless=False):
         """
@@ -78,6 +119,28 @@ class GGPokerScraper:
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
 
+        # Only DOM text is scraped: skip images and notification prompts, and return from
+        # driver.get() at DOMContentLoaded (every later step waits for its own element)
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+        chrome_options.page_load_strategy = "eager"
+
+        # Turn off browser subsystems a scraping session never uses
+        for flag in (
+            "--blink-settings=imagesEnabled=false",
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--disable-features=Translate,MediaRouter",
+            "--mute-audio",
+            "--no-first-run",
+            "--metrics-recording-only",
+        ):
+            chrome_options.add_argument(flag)
+
         # Allow overriding Chrome binary (useful in Docker with Chromium)
         chrome_bin = os.getenv("CHROME_BIN")
         if chrome_bin:
@@ -85,24 +148,81 @@ class GGPokerScraper:
 
         # Install and setup ChromeDriver automatically, but allow a fixed binary path
         chromedriver_bin = os.getenv("CHROME_DRIVER_BIN")
+        cache_file = None
         if chromedriver_bin and os.path.exists(chromedriver_bin):
             service = Service(executable_path=chromedriver_bin)
         else:
             chrome_type_env = os.getenv("CHROME_TYPE", "chrome").lower()
-            if chrome_type_env == "chromium":
-                service = Service(ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install())
-            else:
-                service = Service(ChromeDriverManager().install())
+            cache_file = os.path.join(DRIVER_PATH_CACHE_DIR, f"chromedriver_path_{chrome_type_env}")
+            service = Service(executable_path=self._resolve_chromedriver_path(chrome_type_env, cache_file))
         
         try:
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Explicit waits only: an implicit wait would stack on top of every WebDriverWait poll
+            self.driver.implicitly_wait(0)
+            self.wait = WebDriverWait(self.driver, WAIT_TIMEOUT, poll_frequency=WAIT_POLL_SECONDS)
+            self.dropdown_wait = WebDriverWait(self.driver, DROPDOWN_OPEN_TIMEOUT, poll_frequency=WAIT_POLL_SECONDS)
+            self.rows_refresh_wait = WebDriverWait(self.driver, ROWS_REFRESH_TIMEOUT, poll_frequency=WAIT_POLL_SECONDS)
+            self.block_tracking_urls()
             # Remove webdriver property to avoid detection
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             print("✅ WebDriver initialized successfully")
         except Exception as e:
             print(f"❌ Error setting up WebDriver: {e}")
+            # The cached driver may no longer match the installed Chrome; resolve again next time
+            if cache_file and os.path.exists(cache_file):
+                os.remove(cache_file)
             raise
 
+    def _resolve_chromedriver_path(self, chrome_type: str, cache_file: str) -> str:
+        """Return the chromedriver path, asking webdriver_manager only when no cached path is usable"""
+        try:
+            with open(cache_file) as f:
+                cached = f.read().strip()
+            if os.path.isfile(cached) and os.access(cached, os.X_OK):
+                return cached
+        except OSError:
+            pass
+        if chrome_type == "chromium":
+            path = ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+        else:
+            path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "w") as f:
+                f.write(path)
+        except OSError as e:
+            print(f"⚠️ Could not cache chromedriver path: {e}")
+        return path
+
+    def block_tracking_urls(self):
+        """Drop analytics/ad/font requests in the current tab; they only delay page load.
+        CDP network settings are per target, so every new tab needs this before it navigates.
+        Best effort: the scrape works the same if DevTools rejects the command
+        """
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            print(f"⚠️ Could not set blocked URLs: {e}")
+
+    def open_tab(self, url):
+        """Open `url` in a new tab with URL blocking already applied, and switch to it"""
+        # Start blank so blocking is in place before the first request; Chrome's target id
+        # doubles as the window handle, so there is no need to list handles to find it
+        target = self.driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank"})
+        self.driver.switch_to.window(target["targetId"])
+        self.block_tracking_urls()
+        self.driver.get(url)
+
+    def reset_windows(self):
+        """Close every tab except the first and switch back to it"""
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+
     def access_ggpoker_page(self):
         """Access the GGPoker Omaha Daily Leaderboard page"""
         url = self.promo_url
@@ -111,11 +231,8 @@ class GGPokerScraper:
             print(f"🌐 Accessing: {url}")
             self.driver.get(url)
             
-            # Wait for page to load
-            time.sleep(3)
-            
             # Wait for the main content to be present
-            WebDriverWait(self.driver, 10).until(
+            self.wait.until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
             
@@ -132,18 +249,15 @@ class GGPokerScraper:
             # Look for the exact game heading (env GAME_NAME)
             name_literal = self._build_xpath_literal(self.game_name)
             heading_xpath = f"//h4[normalize-space(text())={name_literal}]"
-            game_heading = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, heading_xpath))
-            )
-            print(f"✅ Found {self.game_name} section heading")
             
-            # Find the iframe that is the first responsive-iframe sibling under this heading
+            # Find the iframe that is the first responsive-iframe sibling under this heading.
+            # The path goes through the heading, so one wait covers both.
             iframe_xpath = heading_xpath + "/following-sibling::div[contains(@class,'responsive-iframe')][1]//iframe"
-            iframe = WebDriverWait(self.driver, 10).until(
+            iframe = self.wait.until(
                 EC.presence_of_element_located((By.XPATH, iframe_xpath))
             )
             
-            print("✅ Found matching iframe under heading")
+            print(f"✅ Found matching iframe under {self.game_name} heading")
             
             # Get the iframe source URL
             iframe_src = iframe.get_attribute("src")
@@ -162,15 +276,11 @@ class GGPokerScraper:
             
             # Scroll to the iframe to make it visible
             self.driver.execute_script("arguments[0].scrollIntoView(true);", iframe)
-            time.sleep(1)
             
             # Click on the iframe
             iframe.click()
             print("✅ Clicked on iframe")
             
-            # Wait a moment to see if anything happens
-            time.sleep(2)
-            
             return True
             
         except Exception as e:
@@ -182,17 +292,12 @@ class GGPokerScraper:
         try:
             print(f"🔍 Exploring iframe content at: {iframe_src}")
             
-            # Open the iframe URL in a new tab
-            self.driver.execute_script(f"window.open('{iframe_src}', '_blank');")
-            
-            # Switch to the new tab
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+            # Open the iframe URL in a new tab (via DevTools, with tracking URLs blocked)
+            self.open_tab(iframe_src)
             
             print("✅ Opened iframe content in new tab")
             
-            # Wait for the new page to load
-            time.sleep(3)
-            
+            # No fixed sleep: the dropdown lookup that follows waits for the page to render
             return True
             
         except Exception as e:
@@ -205,17 +310,16 @@ class GGPokerScraper:
             print("🔍 Looking for dropdown-layer class...")
             
             # Wait for the dropdown to be present
-            dropdown = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "dropdown-layer"))
+            dropdown = self.wait.until(
+                EC.presence_of_element_located(DROPDOWN_LOCATOR)
             )
             print("✅ Found dropdown-layer element")
             
-            # Wait a bit more for Angular content to load
+            # Wait for Angular to render the list elements (li) within the dropdown
             print("⏳ Waiting for Angular content to load...")
-            time.sleep(3)
-            
-            # Find all list elements (li) within the dropdown
-            list_elements = dropdown.find_elements(By.TAG_NAME, "li")
+            list_elements = self.wait.until(
+                lambda d: dropdown.find_elements(By.TAG_NAME, "li")
+            )
             print(f"📋 Found {len(list_elements)} list elements in dropdown")
             
             return list_elements
@@ -230,47 +334,62 @@ class GGPokerScraper:
             print(f"🔄 Starting to click through {len(list_elements)} blind levels...")
             
             # Find the 'blind-text' class clickable element
-            blind_text_element = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CLASS_NAME, "blind-text"))
+            blind_text_element = self.wait.until(
+                EC.element_to_be_clickable(BLIND_TEXT_LOCATOR)
             )
             print(f"  ✅ Found 'blind-text' clickable element")
             
-            dropdown = self.driver.find_element(By.CLASS_NAME, "dropdown-layer")
+            dropdown = self.driver.find_element(*DROPDOWN_LOCATOR)
+            # Read every list element's text in one script call rather than per iteration
+            list_texts = self.driver.execute_script(
+                "return Array.from(arguments[0], function (li) { return li.textContent; });",
+                list_elements,
+            )
             for i, list_element in enumerate(list_elements):
                 try:
                     print(f"\n🖱️ Processing blind level {i}/{len(list_elements)}...")
                     
                     # Get the text content of the current list element
-                    text_content = list_element.get_attribute('textContent').strip() if list_element.get_attribute('textContent') else ''
+                    text_content = list_texts[i].strip() if list_texts[i] else ''
                     
                     # Click on it to open the dropdown
                     print(f"  🖱️ Clicking on 'blind-text' element...")
                     blind_text_element.click()
                     
-                    # Wait a moment for the dropdown to open
-                    time.sleep(2)
-                    
-                    # Check if the dropdown now has 'layer-open' class
-                    classes = dropdown.get_attribute("class")
+                    # Wait for the dropdown to open (gets the 'layer-open' class)
+                    try:
+                        self.dropdown_wait.until(
+                            lambda d: "layer-open" in (dropdown.get_attribute("class") or "")
+                        )
+                        dropdown_open = True
+                    except TimeoutException:
+                        dropdown_open = False
                     
-                    if "layer-open" in classes:
+                    if dropdown_open:
                         print(f"  ✅ Dropdown opened successfully (has 'layer-open' class)")
                         print(f"  📋 List elements are now clickable")
                         # Click on the actual list element
                         print(f"  🖱️ Clicking on list element {i}...")
 
+                        # Remember the current first row so we can tell when the table re-renders
+                        old_rows = self.driver.find_elements(*RANKING_ROW_LOCATOR)
                         list_element.click()
-                        time.sleep(7)
+                        if old_rows:
+                            try:
+                                self.rows_refresh_wait.until(EC.staleness_of(old_rows[0]))
+                            except TimeoutException:
+                                # Same rows kept (e.g. level already shown); fall through as before
+                                pass
+                        self.wait.until(
+                            EC.presence_of_element_located(RANKING_ROW_LOCATOR)
+                        )
 
                         # Now extract player ranking data from the table
                         self.extract_player_ranking_data(text_content)
                         
                     else:
                         print(f"  ⚠️ Dropdown did not get 'layer-open' class")
-                        print(f"  🔍 Current classes: {classes}")
-                    
-                    # Wait a bit before processing next element
-                    time.sleep(2)
+                        print(f"  🔍 Current classes: {dropdown.get_attribute('class')}")
                     
                 except Exception as e:
                     print(f"  ❌ Error processing blind level {i}: {e}")
@@ -291,14 +410,15 @@ class GGPokerScraper:
             print("    🔍 Looking for playerRankingBody class...")
             
             # Wait for the player ranking body to be present
-            ranking_body = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "playerRankingBody"))
+            ranking_body = self.wait.until(
+                EC.presence_of_element_located(RANKING_BODY_LOCATOR)
             )
             print("    ✅ Found playerRankingBody element")
             
-            # Find all tr tags within the ranking body
-            tr_elements = ranking_body.find_elements(By.TAG_NAME, "tr")
-            print(f"    📋 Found {len(tr_elements)} table rows")
+            # Read all tr rows within the ranking body in a single script call
+            # instead of several WebDriver round-trips per cell
+            table_rows = self.driver.execute_script(RANKING_ROWS_JS, ranking_body)
+            print(f"    📋 Found {len(table_rows)} table rows")
             
             # Get timestamp and blind level info
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -311,46 +431,56 @@ class GGPokerScraper:
             table_name = self.db_manager.get_leaderboard_table_name(game, blind_level)
             print(f"   Table name: {table_name}")
             
-            # Normalized path: create update batch and resolve leaderboard id
-            lb_id = self.db_manager.get_or_create_leaderboard_id(table_name)
-            update_id = self.db_manager.create_update_batch(timestamp)
-            
-            # Process each player row
-            for i, tr in enumerate(tr_elements, 1):
-                try:
-                    td_elements = tr.find_elements(By.TAG_NAME, "td")
-                    if len(td_elements) >= 4:
-                        # name (td[1]), country (td[2]), points (td[3])
-                        player_name = td_elements[1].get_attribute('textContent').strip() if td_elements[1].get_attribute('textContent') else ''
-                        # Extract country from the <span> child with 'data-title' attribute
-                        country = None
-                        try:
-                            span = td_elements[2].find_element(By.TAG_NAME, "span")
-                            country = span.get_attribute("data-title")
+            # Normalized path: create update batch and resolve leaderboard id.
+            # The whole snapshot is one transaction, committed once after the row loop
+            # and rolled back if any part of it fails
+            self.db_manager.begin_batch()
+            try:
+                lb_id = self.db_manager.get_or_create_leaderboard_id(table_name)
+                update_id = self.db_manager.create_update_batch(timestamp)
+                
+                # Process each player row; rows are collected and written with one id lookup
+                # and one fact insert per snapshot
+                ranking_rows = []
+                for i, (td_count, name_text, country, points_text) in enumerate(table_rows, 1):
+                    try:
+                        if td_count >= 4:
+                            # name (td[1]), country (td[2] <span data-title>), points (td[3])
+                            player_name = name_text.strip() if name_text else ''
                             if country:
                                 country = country.strip()
-                        except Exception:
-                            country = None
-                        # print(f"      🔍 Player: {player_name}, Country: {country}")
-                        points_text = td_elements[3].get_attribute('textContent').strip() if td_elements[3].get_attribute('textContent') else ''
+                            # print(f"      🔍 Player: {player_name}, Country: {country}")
+                            points_text = points_text.strip() if points_text else ''
                         
-                        if player_name and points_text:
-                            # Convert points like "1,234.56" to float
-                            try:
-                                pts = float(points_text.replace(',', ''))
-                            except Exception:
-                                continue
-                            player_id = self.db_manager.get_or_create_player_id(player_name, country)
-                            self.db_manager.insert_fact(lb_id, update_id, player_id, pts)
+                            if player_name and points_text:
+                                # Convert points like "1,234.56" to float
+                                try:
+                                    pts = float(points_text.replace(',', ''))
+                                except Exception:
+                                    continue
+                                ranking_rows.append((player_name, country, pts))
+                            else:
+                                print(f"      ⚠️ Row {i}: Missing name or points")
                         else:
-                            print(f"      ⚠️ Row {i}: Missing name or points")
-                    else:
-                        print(f"      ⚠️ Row {i}: Not enough td elements ({len(td_elements)})")
-                except Exception as e:
-                    print(f"      ❌ Error processing row {i}: {e}")
-                    continue
-            
-            print(f"    ✅ Successfully processed {len(tr_elements)} player entries")
+                            print(f"      ⚠️ Row {i}: Not enough td elements ({td_count})")
+                    except Exception as e:
+                        print(f"      ❌ Error processing row {i}: {e}")
+                        continue
+                player_ids = self.db_manager.get_or_create_player_ids(
+                    [(name, country) for name, country, _ in ranking_rows]
+                )
+                # Keyed by id so a repeated name keeps its last row, as the per-row upsert did
+                points_by_player = {player_ids[name]: pts for name, _, pts in ranking_rows}
+                self.db_manager.insert_facts(
+                    [(lb_id, update_id, player_id, pts) for player_id, pts in points_by_player.items()]
+                )
+            except Exception:
+                # Never commit a half-written snapshot (e.g. an update_batch row with no facts)
+                self.db_manager.abort_batch()
+                raise
+            self.db_manager.end_batch()
+            
+            print(f"    ✅ Successfully processed {len(table_rows)} player entries")
             
         except Exception as e:
             print(f"    ❌ Error extracting player ranking data: {e}")
@@ -364,6 +494,9 @@ class GGPokerScraper:
         try:
             print("🚀 Starting GGPoker scraping session...")
             
+            # A reused browser still has the previous session's iframe tab open
+            self.reset_windows()
+            
             # Step 1: Access the main page
             if not self.access_ggpoker_page():
                 return False
@@ -446,15 +579,35 @@ def main():
 
     if args.interval and args.interval > 0:
         print(f"🔁 Running every {args.interval} seconds. Press Ctrl+C to stop.")
+        # Keep one browser (and DB connection) across runs; start a fresh one only after a failure
+        scraper = None
         try:
             while True:
                 start_ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 print(f"\n⏱️ {start_ts} - Starting run")
-                run_once(args.headless)
+                try:
+                    if scraper is None:
+                        scraper = GGPokerScraper(headless=args.headless)
+                    else:
+                        # The DB connection may have dropped while idle between runs
+                        scraper.db_manager.ensure_connection()
+                    if not scraper.run_scraping_session():
+                        scraper.close()
+                        scraper = None
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    print(f"❌ Unexpected error: {e}")
+                    if scraper:
+                        scraper.close()
+                        scraper = None
                 print(f"⏳ Sleeping {args.interval} seconds...")
                 time.sleep(args.interval)
         except KeyboardInterrupt:
             print("\n⏹️ Stopped by user")
+        finally:
+            if scraper:
+                scraper.close()
     else:
         run_once(args.headless)
 
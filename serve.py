@@ -8,13 +8,29 @@ def main():
     from gunicorn.app.wsgiapp import run
 
     port = os.getenv("PORT", "8000")
-    # Build argv for gunicorn: gunicorn -b 0.0.0.0:<port> api:app
+    # Build argv for gunicorn: gunicorn -b 0.0.0.0:<port> -w <n> -k <class> ... api:app
     sys.argv = [
         "gunicorn",
         "-b",
         f"0.0.0.0:{port}",
-        "api:app",
+        "--workers",
+        os.getenv("WEB_CONCURRENCY", "2"),
+        "--keep-alive",
+        "5",
+        # Recycle workers periodically to bound memory growth
+        "--max-requests",
+        "1000",
+        "--max-requests-jitter",
+        "100",
     ]
+    # gthread by default so one worker serves several requests while others wait on the DB
+    worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+    sys.argv += ["-k", worker_class]
+    if worker_class == "gevent":
+        sys.argv += ["--worker-connections", os.getenv("GUNICORN_WORKER_CONNECTIONS", "500")]
+    elif worker_class == "gthread":
+        sys.argv += ["--threads", os.getenv("GUNICORN_THREADS", "4")]
+    sys.argv.append("api:app")
     run()
 
 
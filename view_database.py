@@ -4,13 +4,18 @@ Simple script to view the GGPoker leaderboard database contents
 """
 
 import sqlite3
+from urllib.parse import quote
 from tabulate import tabulate
 
 def view_database(db_path="ggpoker_leaderboards.db"):
     """View the database contents"""
     try:
-        conn = sqlite3.connect(db_path)
+        # Read-only: never creates an empty file for a wrong path and never takes a write lock
+        conn = sqlite3.connect(f"file:{quote(db_path)}?mode=ro", uri=True)
         cursor = conn.cursor()
+        cursor.execute("PRAGMA query_only = 1")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.execute("PRAGMA mmap_size = 268435456")
         
         # Get list of all tables
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -33,40 +38,25 @@ def view_database(db_path="ggpoker_leaderboards.db"):
                 cid, col_name, col_type, not_null, default_val, pk = col
                 print(f"    - {col_name} ({col_type})")
             
-            # Get sample data
+            # Get sample data (reusing the column info fetched above)
             try:
-                cursor.execute(f"PRAGMA table_info('{table_name}')")
-                all_columns = [col[1] for col in cursor.fetchall()]
+                all_columns = [col[1] for col in columns]
                 if len(all_columns) > 5:
                     display_columns = [all_columns[0]] + all_columns[-5:]
                 else:
                     display_columns = all_columns
                 col_str = ", ".join([f'"{col}"' for col in display_columns])
-                cursor.execute(f"SELECT {col_str} FROM '{table_name}' LIMIT 5")
-                rows = cursor.fetchall()
-                # INSERT_YOUR_CODE
+                base_sql = f"SELECT {col_str} FROM '{table_name}'"
                 # Sort by the last column in descending order
+                rows = []
                 if display_columns:
                     last_col = display_columns[-1]
-                    cursor.execute(f"SELECT {col_str} FROM '{table_name}' ORDER BY CAST(\"{last_col}\" AS REAL) DESC LIMIT 10")
+                    cursor.execute(f"{base_sql} ORDER BY CAST(\"{last_col}\" AS REAL) DESC LIMIT 10")
                     rows = cursor.fetchall()
                 if rows:
                     print(f"  📊 Sample data ({len(rows)} rows):")
-                    # Get column names for display
-                    col_names = [col[1] for col in columns]
-                    
-                    # Format the data for tabulate
-                    formatted_rows = []
-                    for row in rows:
-                        formatted_row = []
-                        for i, val in enumerate(row):
-                            if val is None:
-                                formatted_row.append("NULL")
-                            else:
-                                formatted_row.append(str(val))
-                        formatted_rows.append(formatted_row)
-                    
-                    print(tabulate(formatted_rows, headers=col_names, tablefmt="grid"))
+                    # tabulate stringifies values itself; NULLs are rendered via missingval
+                    print(tabulate(rows, headers=display_columns, tablefmt="grid", missingval="NULL", disable_numparse=True))
                 else:
                     print("  📊 No data in table")
                     
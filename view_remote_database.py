@@ -6,13 +6,107 @@ Connects to Railway PostgreSQL and displays tables with last 10 columns
 
 import os
 import sys
-from typing import List, Tuple, Optional
-from datetime import datetime
+import hashlib
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Tuple, Optional
+from uuid import uuid4
 import psycopg2
-from urllib.parse import urlparse
+from psycopg2 import sql
 from tabulate import tabulate
 from dotenv import load_dotenv
 
+# Rows pulled per FETCH FORWARD when streaming sample data through a server-side cursor
+SAMPLE_ITERSIZE = 1000
+
+# Tables counted per UNION ALL statement when exact row counts are requested
+EXACT_COUNT_BATCH = 50
+
+TEXT_TYPES = frozenset({
+    'text', 'character varying', 'character',
+})
+
+# Characters of a text cell sent over the wire; one more than format_cell shows, so it still sees it is long
+CELL_FETCH_CHARS = 31
+
+TIMESTAMP_TYPES = frozenset({
+    'timestamp without time zone', 'timestamp with time zone',
+})
+
+def format_timestamp_cell(value) -> str:
+    """Render a timestamp cell"""
+    return "NULL" if value is None else value.strftime("%Y-%m-%d %H:%M:%S")
+
+def format_cell(value) -> str:
+    """Render any other cell, truncating long values for display"""
+    if value is None:
+        return "NULL"
+    str_value = str(value)
+    if len(str_value) > 30:
+        str_value = str_value[:27] + "..."
+    return str_value
+
+@lru_cache(maxsize=512)
+def build_sample_query(table_name: str, selected_columns: Tuple[str, ...], order_column: Optional[str],
+                       order_is_text: bool = True, seek: str = "",
+                       truncated_columns: Tuple[str, ...] = (),
+                       tie_columns: Tuple[str, ...] = ()) -> sql.Composed:
+    """Compose (once per table/column set) the sample-rows query with safely quoted identifiers
+
+    With an order column the query also returns the sort key and the tie-breaker columns
+    (tie_columns, or ctid when none are given) as trailing columns. seek picks
+    a keyset page instead of OFFSET: "after_value" takes (sort_key, *ties, limit) and
+    "in_nulls" takes (*ties, limit) once the page has reached NULL sort keys.
+    Columns in truncated_columns are cut to CELL_FETCH_CHARS server-side.
+    """
+    select_clause = sql.SQL(", ").join(
+        sql.SQL("left({col}, {n}) AS {col}").format(col=sql.Identifier(col), n=sql.Literal(CELL_FETCH_CHARS))
+        if col in truncated_columns else sql.Identifier(col)
+        for col in selected_columns
+    )
+    tbl = sql.Identifier(table_name)
+    if not order_column:
+        # If no obvious ordering column, just get last 10 rows
+        return sql.SQL("SELECT {cols} FROM {tbl} LIMIT %s").format(cols=select_clause, tbl=tbl)
+    if not order_is_text:
+        # Numbers, timestamps etc. sort natively: lets Postgres use a top-N heapsort or an index
+        sort_key = sql.Identifier(order_column)
+    else:
+        # Text: remove commas before casting to REAL for correct numeric sorting (e.g., "1,181.00" -> 1181.00)
+        sort_key = sql.SQL(
+            "CAST(NULLIF(regexp_replace({order}, '[^0-9.-]', '', 'g'), '') AS double precision)"
+        ).format(order=sql.Identifier(order_column))
+    # A unique key breaks ties so keyset pages neither skip nor repeat rows
+    ties = [sql.Identifier(col) for col in tie_columns] or [sql.SQL("ctid")]
+    tie_list = sql.SQL(", ").join(ties)
+    tie_params = sql.SQL(", ").join([sql.Placeholder()] * len(ties))
+    if seek == "after_value":
+        # NULL sort keys come last (NULLS LAST) and never compare, so they stay reachable via OR
+        where = sql.SQL(" WHERE (({key}, {ties}) < (%s, {params}) OR {key} IS NULL)").format(
+            key=sort_key, ties=tie_list, params=tie_params)
+    elif seek == "in_nulls":
+        where = sql.SQL(" WHERE {key} IS NULL AND ({ties}) < ({params})").format(
+            key=sort_key, ties=tie_list, params=tie_params)
+    else:
+        where = sql.SQL("")
+    # ORDER BY uses the trailing aliases: a bare column name would pick the truncated output column
+    tie_aliases = [sql.Identifier(f"gg_tie_{i}") for i in range(len(ties))]
+    trailing = sql.SQL(", ").join(sql.SQL("{} AS {}").format(tie, alias) for tie, alias in zip(ties, tie_aliases))
+    order_ties = sql.SQL(", ").join(sql.SQL("{} DESC").format(alias) for alias in tie_aliases)
+    return sql.SQL(
+        "SELECT {cols}, {key} AS gg_sort_key, {trailing} FROM {tbl}{where} "
+        "ORDER BY gg_sort_key DESC NULLS LAST, {order_ties} LIMIT %s"
+    ).format(cols=select_clause, key=sort_key, trailing=trailing, tbl=tbl, where=where, order_ties=order_ties)
+
+def build_sample_with_total_query(table_name: str, sample_query: sql.Composed) -> sql.Composed:
+    """Wrap a sample query so the exact row count comes back in the same round trip (as column 0)"""
+    # LEFT JOIN keeps one row even for an empty table; row_count == 0 means the sample part is all NULL
+    return sql.SQL(
+        "SELECT total.row_count, sample.* FROM (SELECT COUNT(*) AS row_count FROM {tbl}) AS total "
+        "LEFT JOIN LATERAL ({sample}) AS sample ON true"
+    ).format(tbl=sql.Identifier(table_name), sample=sample_query)
+
+
 class RemoteDatabaseViewer:
     def __init__(self):
         """Initialize connection to remote PostgreSQL database"""
@@ -30,39 +124,50 @@ class RemoteDatabaseViewer:
             print("❌ DATABASE_URL must be a PostgreSQL connection string!")
             sys.exit(1)
             
-        self.connect_to_database()
+        # Schema metadata cached for the session; cleared by refresh_schema()
+        self._tables_cache: Optional[List[str]] = None
+        self._struct_cache: Dict[str, List[Tuple]] = {}
+        self._pk_cache: Dict[str, Tuple[str, ...]] = {}
+        self._base_tables = set()
+        self._data_query_cache: Dict[Tuple, Tuple[str, str]] = {}
+        
+        # Catalog queries share one cursor and statements PREPAREd on this session
+        self._cursor = None
+        self._prepared = set()
+        
+        # Connected lazily on first use, so leaving the menu straight away costs no handshake
+        self._connection = None
+    
+    @property
+    def connection(self):
+        """The PostgreSQL connection, established on first access"""
+        if self._connection is None or self._connection.closed:
+            self.connect_to_database()
+        return self._connection
     
     def connect_to_database(self):
         """Establish connection to remote PostgreSQL database"""
         try:
-            # Parse the DATABASE_URL
-            url = urlparse(self.database_url)
-            
-            # Debug: Print parsed URL components
-            print(f"🔍 Parsed URL components:")
-            print(f"   Scheme: {url.scheme}")
-            print(f"   Username: {url.username}")
-            print(f"   Password: {'*' * len(url.password) if url.password else 'None'}")
-            print(f"   Hostname: {url.hostname}")
-            print(f"   Port: {url.port}")
-            print(f"   Path: {url.path}")
-            print(f"   Database name: {url.path[1:] if url.path else 'railway'}")
-            print()
-            
-            # Connect to PostgreSQL
-            self.connection = psycopg2.connect(
-                host=url.hostname,
-                port=url.port or 5432,
-                database=url.path[1:] if url.path else 'railway',  # Remove leading slash or default to 'railway'
-                user=url.username,
-                password=url.password
+            # libpq parses the URL itself; keepalives stop idle sessions dying silently behind NAT
+            self._connection = psycopg2.connect(
+                self.database_url,
+                connect_timeout=5,
+                keepalives=1,
+                keepalives_idle=30,
+                keepalives_interval=10,
+                keepalives_count=3,
+                tcp_user_timeout=30000,
             )
             
-            print(f"✅ Connected to PostgreSQL database: {url.path[1:] if url.path else 'railway'}")
-            print(f"📍 Host: {url.hostname}:{url.port or 5432}")
-            print(f"👤 User: {url.username}")
+            info = self._connection.info
+            print(f"✅ Connected to PostgreSQL database: {info.dbname}")
+            print(f"📍 Host: {info.host}:{info.port}")
+            print(f"👤 User: {info.user}")
             print()
             
+            self._cursor = None
+            self._prepared = set()
+            
         except ImportError:
             print("❌ psycopg2 not installed. Install with: pip install psycopg2-binary")
             sys.exit(1)
@@ -70,107 +175,276 @@ class RemoteDatabaseViewer:
             print(f"❌ Error connecting to PostgreSQL: {e}")
             sys.exit(1)
     
-    def get_all_tables(self) -> List[str]:
-        """Get all table names from the database"""
+    def catalog_cursor(self):
+        """Return the shared cursor for small catalog queries, opening it on first use"""
+        if self._cursor is None or self._cursor.closed:
+            self._cursor = self.connection.cursor()
+        return self._cursor
+    
+    def reset_catalog_cursor(self):
+        """Drop the shared cursor and end the failed transaction after a catalog error"""
+        try:
+            self.connection.rollback()
+            if self._cursor is not None:
+                self._cursor.close()
+        except Exception:
+            pass
+        self._cursor = None
+    
+    def execute_prepared(self, cursor, name: str, query: str, params: tuple) -> None:
+        """Execute `query` (written with %s placeholders) as the named prepared statement.
+        Parse/plan happens once per session; later calls only send EXECUTE.
+        """
+        if name not in self._prepared:
+            parts = query.split("%s")
+            body = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], 1))
+            cursor.execute(f"PREPARE {name} AS {body}")
+            self._prepared.add(name)
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    
+    def refresh_schema(self):
+        """Forget cached table names, structures and prepared statements so the next lookup hits the catalog again"""
+        self._tables_cache = None
+        self._struct_cache.clear()
+        self._pk_cache.clear()
+        self._base_tables = set()
+        self._data_query_cache.clear()
+        if self._prepared:
+            try:
+                self.catalog_cursor().execute("DEALLOCATE ALL")
+            except Exception as e:
+                self.reset_catalog_cursor()
+                print(f"❌ Error dropping prepared statements: {e}")
+            self._prepared.clear()
+    
+    def load_schema(self):
+        """Snapshot every public table's columns with one catalog query and fill the schema caches"""
         try:
-            cursor = self.connection.cursor()
+            cursor = self.catalog_cursor()
             cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                ORDER BY table_name
+                SELECT 
+                    c.table_name,
+                    c.column_name,
+                    c.data_type,
+                    c.is_nullable,
+                    c.column_default,
+                    c.ordinal_position,
+                    pk.key_position,
+                    t.table_type
+                FROM information_schema.columns c
+                JOIN information_schema.tables t
+                  ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+                LEFT JOIN (
+                    SELECT kcu.table_name, kcu.column_name, kcu.ordinal_position AS key_position
+                    FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu
+                      ON kcu.constraint_schema = tc.constraint_schema
+                     AND kcu.constraint_name = tc.constraint_name
+                    WHERE tc.table_schema = 'public' AND tc.constraint_type = 'PRIMARY KEY'
+                ) pk ON pk.table_name = c.table_name AND pk.column_name = c.column_name
+                WHERE c.table_schema = 'public'
+                ORDER BY c.table_name, c.ordinal_position
             """)
             
-            tables = [row[0] for row in cursor.fetchall()]
-            cursor.close()
-            return tables
+            structures: Dict[str, List[Tuple]] = {}
+            key_positions: Dict[str, List[Tuple[int, str]]] = {}
+            base_tables = set()
+            for row in cursor:
+                structures.setdefault(row[0], []).append(row[1:6])
+                if row[6] is not None:
+                    key_positions.setdefault(row[0], []).append((row[6], row[1]))
+                if row[7] == 'BASE TABLE':
+                    base_tables.add(row[0])
+            self._struct_cache = structures
+            self._pk_cache = {table: tuple(col for _, col in sorted(keys)) for table, keys in key_positions.items()}
+            self._base_tables = base_tables
+            self._tables_cache = list(structures)
             
         except Exception as e:
-            print(f"❌ Error getting tables: {e}")
-            return []
+            self.reset_catalog_cursor()
+            print(f"❌ Error loading schema: {e}")
+    
+    def get_all_tables(self) -> List[str]:
+        """Get all table names from the database"""
+        if self._tables_cache is None:
+            self.load_schema()
+        return self._tables_cache or []
     
     def get_table_structure(self, table_name: str) -> List[Tuple]:
         """Get table structure with column information"""
+        if self._tables_cache is None:
+            self.load_schema()
+        return self._struct_cache.get(table_name, [])
+    
+    def get_table_summaries(self) -> List[Tuple[str, int, int]]:
+        """Get (table name, estimated row count, column count) for every public table in one catalog query"""
         try:
-            cursor = self.connection.cursor()
+            cursor = self.catalog_cursor()
+            # reltuples is the planner's estimate (-1 if the table was never analyzed);
+            # reading it avoids a COUNT(*) scan and a round trip per table
             cursor.execute("""
                 SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    ordinal_position
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name,))
+                    c.relname,
+                    c.reltuples::bigint,
+                    (SELECT count(*) FROM pg_attribute a
+                     WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped)
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+                ORDER BY c.relname
+            """)
             
-            columns = cursor.fetchall()
-            cursor.close()
-            return columns
+            summaries = cursor.fetchall()
+            return summaries
             
         except Exception as e:
-            print(f"❌ Error getting structure for table {table_name}: {e}")
+            self.reset_catalog_cursor()
+            print(f"❌ Error getting table summaries: {e}")
             return []
     
-    def get_table_data(self, table_name: str, limit: int = 5) -> Tuple[List[str], List[List]]:
-        """Get sample data from table (last 10 rows)"""
+    def estimate_rows(self, table_name: str) -> Optional[int]:
+        """Get the planner's row estimate for a table from EXPLAIN (no table scan)"""
         try:
-            cursor = self.connection.cursor()
+            cursor = self.catalog_cursor()
+            cursor.execute(sql.SQL("EXPLAIN (FORMAT JSON) SELECT * FROM {tbl}").format(tbl=sql.Identifier(table_name)))
+            return int(cursor.fetchone()[0][0]['Plan']['Plan Rows'])
             
-            # First get the column names
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name,))
+        except Exception as e:
+            self.reset_catalog_cursor()
+            print(f"❌ Error estimating rows for table {table_name}: {e}")
+            return None
+    
+    def get_exact_row_counts(self, tables: List[str]) -> Dict[str, int]:
+        """Get exact COUNT(*) for the given tables, EXACT_COUNT_BATCH tables per UNION ALL round trip"""
+        counts: Dict[str, int] = {}
+        try:
+            cursor = self.catalog_cursor()
+            for start in range(0, len(tables), EXACT_COUNT_BATCH):
+                query = sql.SQL(" UNION ALL ").join(
+                    sql.SQL("SELECT {name}, COUNT(*) FROM {tbl}").format(
+                        name=sql.Literal(table_name), tbl=sql.Identifier(table_name))
+                    for table_name in tables[start:start + EXACT_COUNT_BATCH]
+                )
+                cursor.execute(query)
+                counts.update(cursor.fetchall())
+            return counts
             
-            column_names = [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            self.reset_catalog_cursor()
+            print(f"❌ Error counting rows: {e}")
+            return counts
+    
+    def get_table_data(self, table_name: str, limit: int = 5, with_total: bool = False,
+                       after: Optional[Tuple] = None,
+                       columns: Optional[List[Tuple]] = None) -> Tuple[List[str], List[List], Optional[int], Optional[Tuple]]:
+        """Get sample data from table (last 10 rows), plus the exact row count if with_total is set
+
+        Returns (columns, rows, total_rows, next_after); pass next_after back as `after`
+        to fetch the following page (None when there are no more rows). `columns` is the
+        table structure if the caller already has it.
+        """
+        try:
+            # Column names come from the caller's or the (cached) table structure
+            structure = columns if columns is not None else self.get_table_structure(table_name)
+            column_names = list(map(itemgetter(0), structure))
           
             if not column_names:
-                return [], []
+                return [], [], None, None
             
             # Get the last 10 rows (assuming there's some ordering column)
             # Try to find a timestamp or ID column for ordering
             # Use the last column (assumed to be a ts column with the latest timestamp) as the order column,
             # and order by its numeric value (even if stored as string)
             order_column = None
+            order_is_text = True
             if column_names:
                 order_column = column_names[-1]
+                order_is_text = structure[-1][1] in TEXT_TYPES
 
-            # Determine which columns to select: first column and last 4 columns (no duplicates)
-            selected_columns = []
-            if column_names:
-                selected_columns.append(column_names[0])
-                # Add last 4 columns, skipping the first if it's already included
-                num_last_columns = 5  # You can set this to any number before this statement
-                last_cols = column_names[-num_last_columns:] if len(column_names) > num_last_columns else column_names[1:]
-                for col in last_cols:
-                    if col not in selected_columns:
-                        selected_columns.append(col)
+            # Determine which columns to select: first column and last N columns (no duplicates, order kept)
+            num_last_columns = 5  # You can set this to any number before this statement
+            selected_columns = list(dict.fromkeys([column_names[0], *column_names[-num_last_columns:]]))
            
-            # Build the SELECT clause
-            select_clause = ", ".join([f'"{col}"' for col in selected_columns])
-
-            if order_column:
-                # Remove commas before casting to REAL for correct numeric sorting (e.g., "1,181.00" -> 1181.00)
-                query = f"SELECT {select_clause} FROM \"{table_name}\" ORDER BY CAST(NULLIF(regexp_replace(\"{order_column}\", '[^0-9.-]', '', 'g'), '') AS double precision) DESC NULLS LAST LIMIT %s"
+            # Long text cells are only shown truncated, so cut them in SQL; the sort key and
+            # tie-breakers used for paging come back as separate, untruncated trailing columns
+            truncated_columns = tuple(
+                col[0] for col in structure
+                if col[1] in TEXT_TYPES and col[0] in selected_columns
+            )
+            # Primary key makes the keyset position unique; ctid stands in for tables without one,
+            # and views (no ctid) fall back to every column, which only identical rows can tie on
+            tie_columns = self._pk_cache.get(table_name, ())
+            if not tie_columns and table_name not in self._base_tables:
+                tie_columns = tuple(column_names)
+            # First page, then seek past a real sort key, then page through the NULL sort keys
+            if after is None:
+                seek = ""
+            elif after[0] is None:
+                seek = "in_nulls"
+            else:
+                seek = "after_value"
+            # Composed query, its rendered text and prepared-statement name, built once per query shape
+            cache_key = (table_name, tuple(selected_columns), order_column, order_is_text,
+                         seek, truncated_columns, tie_columns, with_total)
+            cached_query = self._data_query_cache.get(cache_key)
+            if cached_query is None:
+                query = build_sample_query(table_name, tuple(selected_columns), order_column, order_is_text,
+                                           seek=seek, truncated_columns=truncated_columns, tie_columns=tie_columns)
+                if with_total:
+                    query = build_sample_with_total_query(table_name, query)
+                query_text = query.as_string(self.connection)
+                statement = f"gg_data_{hashlib.md5(query_text.encode()).hexdigest()[:16]}"
+                cached_query = self._data_query_cache[cache_key] = (query_text, statement)
+            query_text, statement = cached_query
+            if seek == "in_nulls":
+                params = (*after[1:], limit)
+            elif seek == "after_value":
+                params = (*after, limit)
             else:
-                # If no obvious ordering column, just get last 10 rows
-                query = f"SELECT {select_clause} FROM \"{table_name}\" LIMIT %s"
+                params = (limit,)
             
-            cursor.execute(query, (limit,))
-            rows = cursor.fetchall()
-            cursor.close()
+            if limit <= SAMPLE_ITERSIZE:
+                # One fetch batch holds the whole sample: run it as a statement PREPAREd per
+                # table/query shape so repeat views skip parse and plan
+                cursor = self.catalog_cursor()
+                try:
+                    self.execute_prepared(cursor, statement, query_text, params)
+                    rows = cursor.fetchall()
+                except Exception:
+                    self.reset_catalog_cursor()
+                    raise
+            else:
+                # Named (server-side) cursor streams rows in SAMPLE_ITERSIZE batches, so memory stays
+                # bounded however large `limit` gets (DECLARE cannot wrap EXECUTE, so no prepare here)
+                cursor = self.connection.cursor(name=f"gg_sample_{uuid4().hex}", scrollable=False, withhold=False)
+                cursor.itersize = SAMPLE_ITERSIZE
+                try:
+                    cursor.execute(query_text, params)
+                    rows = list(cursor)
+                finally:
+                    cursor.close()
+                    # End the read transaction the named cursor opened
+                    self.connection.rollback()
             
-            return selected_columns, rows
+            total_rows = None
+            if with_total:
+                total_rows = rows[0][0] if rows else 0
+                rows = [row[1:] for row in rows] if total_rows else []
+            
+            # Strip the trailing sort key and tie-breakers, remembering where the page ended
+            next_after = None
+            if order_column:
+                position_width = 1 + (len(tie_columns) or 1)
+                if len(rows) == limit:
+                    next_after = tuple(rows[-1][-position_width:])
+                rows = [row[:-position_width] for row in rows]
+            
+            return selected_columns, rows, total_rows, next_after
             
         except Exception as e:
             print(f"❌ Error getting data from table {table_name}: {e}")
-            return [], []
+            return [], [], None, None
     
     def display_table_info(self, table_name: str):
         """Display comprehensive information about a table"""
@@ -189,15 +463,11 @@ class RemoteDatabaseViewer:
         print("-" * 80)
         
         # Display column information
-        column_info = []
-        for col in columns:
-            column_info.append([
-                col[0],  # column_name
-                col[1],  # data_type
-                "NULL" if col[2] == "YES" else "NOT NULL",
-                str(col[3]) if col[3] else "No default",
-                col[4]   # ordinal_position
-            ])
+        column_info = [
+            [name, data_type, "NULL" if nullable == "YES" else "NOT NULL",
+             str(default) if default else "No default", position]
+            for name, data_type, nullable, default, position in columns
+        ]
         
         print(tabulate(column_info, 
                       headers=["Column Name", "Data Type", "Nullable", "Default", "Position"],
@@ -207,27 +477,11 @@ class RemoteDatabaseViewer:
         print(f"\n📊 SAMPLE DATA (Last {min(10, len(columns))} rows):")
         print("-" * 80)
         
-        column_names, rows = self.get_table_data(table_name, 10)
+        # Sample rows and exact row count share one round trip
+        column_names, rows, row_count, next_after = self.get_table_data(table_name, 10, with_total=True, columns=columns)
         
         if rows:
-            # Format the data for display
-            formatted_rows = []
-            for row in rows:
-                formatted_row = []
-                for i, value in enumerate(row):
-                    if value is None:
-                        formatted_row.append("NULL")
-                    elif isinstance(value, datetime):
-                        formatted_row.append(value.strftime("%Y-%m-%d %H:%M:%S"))
-                    else:
-                        # Truncate long values for display
-                        str_value = str(value)
-                        if len(str_value) > 30:
-                            str_value = str_value[:27] + "..."
-                        formatted_row.append(str_value)
-                formatted_rows.append(formatted_row)
-            
-            print(tabulate(formatted_rows, headers=column_names, tablefmt="grid"))
+            print(tabulate(self.format_sample_rows(table_name, column_names, rows), headers=column_names, tablefmt="grid"))
         else:
             print("ℹ️  No data found in table")
         
@@ -235,53 +489,69 @@ class RemoteDatabaseViewer:
         print(f"   • Total columns: {len(columns)}")
         print(f"   • Sample rows shown: {len(rows) if rows else 0}")
         
-        # Try to get row count
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM \"{table_name}\"")
-            row_count = cursor.fetchone()[0]
+        if row_count is None:
+            # Combined sample+count query failed; count on its own so the total still shows
+            row_count = self.get_exact_row_counts([table_name]).get(table_name)
+        if row_count is not None:
             print(f"   • Total rows: {row_count:,}")
-            cursor.close()
-        except:
+        else:
             print("   • Total rows: Unable to determine")
+        
+        # Keyset paging: each page seeks past the last row shown instead of using OFFSET
+        while next_after is not None:
+            if input("\n➡️  Press Enter for the next 10 rows, or 'q' to go back: ").strip().lower() == "q":
+                break
+            column_names, rows, _, next_after = self.get_table_data(table_name, 10, after=next_after, columns=columns)
+            if not rows:
+                break
+            print(tabulate(self.format_sample_rows(table_name, column_names, rows), headers=column_names, tablefmt="grid"))
+    
+    def format_sample_rows(self, table_name: str, column_names: List[str], rows: List[Tuple]) -> List[List[str]]:
+        """Format sample rows for display, picking each column's formatter once from its data type"""
+        data_types = {col[0]: col[1] for col in self.get_table_structure(table_name)}
+        formatters = [
+            format_timestamp_cell if data_types.get(name) in TIMESTAMP_TYPES else format_cell
+            for name in column_names
+        ]
+        return [[fmt(value) for fmt, value in zip(formatters, row)] for row in rows]
     
-    def display_database_overview(self):
-        """Display overview of all tables in the database"""
-        tables = self.get_all_tables()
+    def display_database_overview(self, exact: bool = False):
+        """Display overview of all tables in the database (exact row counts on request)"""
+        summaries = self.get_table_summaries()
         
-        if not tables:
+        if not summaries:
             print("❌ No tables found in database")
             return
         
         print(f"\n🗄️  DATABASE OVERVIEW")
         print(f"{'='*80}")
-        print(f"📊 Total tables found: {len(tables)}")
+        print(f"📊 Total tables found: {len(summaries)}")
         print()
         
-        # Display table summary
+        # Display table summary (row counts are planner estimates unless exact is set)
+        exact_counts = self.get_exact_row_counts([summary[0] for summary in summaries]) if exact else {}
         table_summary = []
-        for table_name in tables:
-            
-            try:
-                cursor = self.connection.cursor()
-                
-                cursor.execute(f"SELECT COUNT(*) FROM \"{table_name}\"")
-                row_count = cursor.fetchone()[0]
-                cursor.close()
-                
-                # Get column count
-                columns = self.get_table_structure(table_name)
-                column_count = len(columns)
-                
-                table_summary.append([
-                    table_name,
-                    f"{row_count:,}",
-                    column_count,
-                    "✅" if row_count > 0 else "⚠️"
-                ])
-                
-            except Exception as e:
-                table_summary.append([table_name, "Error", "Error", "❌"])
+        for table_name, row_estimate, column_count in summaries:
+            if exact:
+                row_count = exact_counts.get(table_name)
+                if row_count is None:
+                    table_summary.append([table_name, "Error", column_count, "❌"])
+                    continue
+                row_display = f"{row_count:,}"
+            else:
+                if row_estimate < 0:
+                    # Never analyzed: reltuples is -1, so ask the planner (it estimates from the page count)
+                    row_estimate = self.estimate_rows(table_name)
+                    if row_estimate is None:
+                        row_estimate = -1
+                row_count = row_estimate
+                row_display = f"~{row_estimate:,}" if row_estimate >= 0 else "Unknown"
+            table_summary.append([
+                table_name,
+                row_display,
+                column_count,
+                "✅" if row_count > 0 else "⚠️"
+            ])
         
         print(tabulate(table_summary, 
                       headers=["Table Name", "Row Count", "Columns", "Status"],
@@ -296,10 +566,12 @@ class RemoteDatabaseViewer:
             print("1. Show database overview")
             print("2. View specific table")
             print("3. List all tables")
-            print("4. Exit")
+            print("4. Refresh schema cache")
+            print("5. Show database overview with exact row counts")
+            print("6. Exit")
             print("-" * 80)
             
-            choice = input("Select an option (1-4): ").strip()
+            choice = input("Select an option (1-6): ").strip()
             
             if choice == "1":
                 self.display_database_overview()
@@ -340,28 +612,32 @@ class RemoteDatabaseViewer:
                     print("❌ No tables found")
                     
             elif choice == "4":
+                self.refresh_schema()
+                print("🔄 Schema cache cleared")
+                
+            elif choice == "5":
+                self.display_database_overview(exact=True)
+                
+            elif choice == "6":
                 print("👋 Goodbye!")
                 break
                 
             else:
-                print("❌ Invalid choice. Please select 1-4.")
+                print("❌ Invalid choice. Please select 1-6.")
     
     def close_connection(self):
         """Close database connection"""
-        if hasattr(self, 'connection'):
-            self.connection.close()
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
             print("🔌 Database connection closed")
 
 def main():
     """Main function to run the remote database viewer"""
     try:
-        print("🚀 Connecting to remote PostgreSQL database...")
+        print("🚀 Starting remote PostgreSQL database viewer...")
         viewer = RemoteDatabaseViewer()
         
-        # Show database overview first
-        viewer.display_database_overview()
-        
-        # Run interactive viewer
+        # Run interactive viewer; the connection opens with the first option that needs it
         viewer.run_interactive_viewer()
         
     except KeyboardInterrupt: